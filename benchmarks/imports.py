@@ -0,0 +1,73 @@
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("numpy", "plotly", "pandas", "dash")
+# consumers compute with numpy, only the plotting stack has to stay out of them
+ALLOWED_MODULES = {"consumers": ("numpy",)}
+
+# each path is run in a fresh interpreter, SystemExit comes from click's --help
+PATHS = {
+    "record": (
+        "import sys\n"
+        "sys.argv = ['echostats', 'record', '--help']\n"
+        "try:\n"
+        "    import echostats.__main__\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    ),
+    "online": (
+        "import sys\n"
+        "sys.argv = ['echostats', 'online', '--help']\n"
+        "try:\n"
+        "    import echostats.__main__\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    ),
+    "consumers": (
+        "import echostats.consumers.disc\n"
+        "import echostats.consumers.heatmap\n"
+        "import echostats.consumers.player\n"
+        "import echostats.consumers.possession\n"
+    ),
+    "graphers (reference)": (
+        "import plotly.express\nimport plotly.graph_objects\nimport pandas\n"
+    ),
+}
+
+REPORT = (
+    "\nimport sys\nprint('loaded:' + ','.join(m for m in {} if m in sys.modules))\n"
+)
+
+
+def run(code: str, repeat: int) -> tuple[float, list[str]]:
+    best = float("inf")
+    loaded: list[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", code + REPORT.format(HEAVY_MODULES)],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        best = min(best, time.perf_counter() - start)
+        report = result.stdout.rsplit("loaded:", 1)[-1].strip()
+        loaded = [i for i in report.split(",") if i]
+    return best, loaded
+
+
+def main(repeat: int = 5) -> int:
+    failed = False
+    print(f"{'path':<22}{'best of ' + str(repeat):>12}  heavy modules loaded")
+    for name, code in PATHS.items():
+        seconds, loaded = run(code, repeat)
+        print(f"{name:<22}{seconds * 1000:>10.0f}ms  {', '.join(loaded) or '-'}")
+        unexpected = [i for i in loaded if i not in ALLOWED_MODULES.get(name, ())]
+        if unexpected and "reference" not in name:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(i) for i in sys.argv[1:])))
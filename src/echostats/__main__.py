@@ -1,8 +1,19 @@
+from typing import Iterable
+from typing import Optional
+
 import click
 from echostats import FileStreamer
 from echostats import OnlineStreamer
+from echostats._abc import BaseConsumer
+from echostats.broadcast import BroadcastConsumer
 from echostats.consumers import DebuggerConsumer
 from echostats.consumers import RecorderConsumer
+from echostats.consumers.timing import CaptureTimingConsumer
+from echostats.memory import format_memory_usage
+from echostats.merge import MergedStreamer
+from echostats.replay_server import ReplayServer
+from echostats.store import MatchStore
+from echostats.streamer import DEFAULT_POLLING_RATES
 
 
 @click.group()
@@ -10,28 +21,216 @@ def cli():
     ...
 
 
+def online_options(command):
+    # options of every command polling a headset, see _online_streamer
+    command = click.option(
+        "--adaptive", is_flag=True, help="poll faster while playing"
+    )(command)
+    command = click.option("--port", default=6721)(command)
+    command = click.option("--rate", default=10)(command)
+    return click.option("--ip", required=True)(command)
+
+
+def _online_streamer(ip: str, rate: float, port: int, adaptive: bool) -> OnlineStreamer:
+    return OnlineStreamer(
+        ip=ip,
+        rate=rate,
+        port=port,
+        rates=DEFAULT_POLLING_RATES if adaptive else None,
+        paused_rate=2 if adaptive else None,
+    )
+
+
 @cli.command()
-@click.option("--ip", required=True)
-@click.option("--rate", default=10)
-def online(ip: str, rate: float):
-    streamer = OnlineStreamer(ip=ip, rate=rate)
-    streamer.consume(consumers=[DebuggerConsumer()])
+@online_options
+@click.option("--interval", default=1.0, help="seconds between printed frames")
+@click.option("--field", multiple=True, help="print only these fields, e.g. disc")
+def online(
+    ip: str,
+    rate: float,
+    port: int,
+    adaptive: bool,
+    interval: float,
+    field: tuple[str, ...],
+):
+    streamer = _online_streamer(ip, rate, port, adaptive)
+    streamer.consume(
+        consumers=[
+            DebuggerConsumer(
+                interval=interval, fields=list(field) or None, streamer=streamer
+            )
+        ]
+    )
+
+
+def print_timing(timing: CaptureTimingConsumer) -> None:
+    summary = timing.summary()
+    if summary.untimed == summary.frames:
+        print(f"{summary.frames} frames, no capture timings recorded")
+        return
+    print(
+        f"{summary.frames} frames, {summary.untimed} without timings, "
+        f"latency p50/p95/p99 {summary.latency_p50}/{summary.latency_p95}/"
+        f"{summary.latency_p99}ms, interval p50/p95 {summary.interval_p50}/"
+        f"{summary.interval_p95}ms, jitter {summary.jitter:.1f}ms, "
+        f"{summary.gaps} gaps ({summary.lost} polls lost), {summary.stale} stale"
+    )
+    for gap in timing.gaps:
+        print(
+            f"{gap.datetime.isoformat(sep=' ', timespec='milliseconds')} "
+            f"gap of {gap.seconds:.2f}s, expected {gap.expected:.2f}s"
+        )
+
+
+def print_memory_usage(consumers: Iterable[BaseConsumer]) -> None:
+    usage = {type(i).__name__: i.memory_usage() for i in consumers}
+    print(f"consumer memory {format_memory_usage(usage)}")
 
 
 @cli.command()
 @click.option("--path", required=True)
-def file(path: str):
+@click.option("--interval", default=1.0, help="seconds between printed frames")
+@click.option("--field", multiple=True, help="print only these fields, e.g. disc")
+def file(path: str, interval: float, field: tuple[str, ...]):
     streamer = FileStreamer(path=path)
-    streamer.consume(consumers=[DebuggerConsumer()])
+    streamer.consume(
+        consumers=[DebuggerConsumer(interval=interval, fields=list(field) or None)]
+    )
+
+
+@cli.command()
+@online_options
+@click.option("--path", required=True)
+@click.option(
+    "--chunk-frames",
+    type=int,
+    default=None,
+    help="write independently compressed chunks of this many frames",
+)
+def record(
+    ip: str,
+    rate: float,
+    port: int,
+    adaptive: bool,
+    path: str,
+    chunk_frames: Optional[int],
+):
+    streamer = _online_streamer(ip, rate, port, adaptive)
+    timing = CaptureTimingConsumer()
+    consumers = [RecorderConsumer(path=path, chunk_frames=chunk_frames), timing]
+    try:
+        streamer.consume(consumers=consumers)
+    finally:
+        print(f"{streamer.frames_saved=} {streamer.polls=} {streamer.unavailable=}")
+        for dtime, effective_rate in streamer.effective_rate_history:
+            print(
+                f"{dtime.isoformat(sep=' ', timespec='seconds')} {effective_rate:.1f}/s"
+            )
+        print_timing(timing)
+        print_memory_usage(consumers)
 
 
 @cli.command()
-@click.option("--ip", required=True)
-@click.option("--rate", default=10)
 @click.option("--path", required=True)
-def record(ip: str, rate: float, path: str):
-    streamer = OnlineStreamer(ip=ip, rate=rate)
-    streamer.consume(consumers=[RecorderConsumer(path=path)])
+def timing(path: str):
+    # capture timings stored in a recording made by `record`
+    consumer = CaptureTimingConsumer()
+    FileStreamer(path=path).consume(consumers=[consumer])
+    print_timing(consumer)
+
+
+@cli.command()
+@online_options
+@click.option("--listen-host", default="127.0.0.1")
+@click.option("--listen-port", default=6722)
+@click.option("--buffer-size", default=64, help="frames buffered per subscriber")
+def broadcast(
+    ip: str,
+    rate: float,
+    port: int,
+    adaptive: bool,
+    listen_host: str,
+    listen_port: int,
+    buffer_size: int,
+):
+    streamer = _online_streamer(ip, rate, port, adaptive)
+    print(
+        f"broadcasting on http://{listen_host}:{listen_port}/frames, /summary "
+        "and /session"
+    )
+    streamer.consume(
+        consumers=[
+            BroadcastConsumer(
+                host=listen_host, port=listen_port, buffer_size=buffer_size
+            )
+        ]
+    )
+
+
+@cli.command()
+@click.option("--db", required=True)
+@click.option("--path", required=True, multiple=True)
+@click.option("--position-sample-every", default=30)
+def ingest(db: str, path: tuple[str, ...], position_sample_every: int):
+    with MatchStore(db) as store:
+        for replay_path in path:
+            if store.ingest(replay_path, position_sample_every=position_sample_every):
+                print(
+                    f"ingested {replay_path}, consumer memory "
+                    f"{format_memory_usage(store.memory_usage)}"
+                )
+            else:
+                print(f"skipped {replay_path}, already ingested")
+
+
+@cli.command()
+@click.option("--path", required=True, multiple=True, help="captures to merge")
+@click.option("--out", required=True)
+@click.option("--chunk-frames", type=int, default=None)
+def merge(path: tuple[str, ...], out: str, chunk_frames: Optional[int]):
+    streamer = MergedStreamer([FileStreamer(path=i) for i in path])
+    streamer.consume(consumers=[RecorderConsumer(path=out, chunk_frames=chunk_frames)])
+    print(
+        f"{sum(streamer.frames_per_source)} frames {streamer.frames_per_source=} "
+        f"{streamer.duplicates=} {streamer.offsets=} {streamer.unaligned=}"
+    )
+
+
+@cli.command("serve-replay")
+@click.option("--path", required=True)
+@click.option("--host", default="127.0.0.1")
+@click.option("--port", default=6721)
+@click.option("--clients", default=1, help="servers on consecutive ports")
+@click.option("--speed", default=1.0, help="playback speed, 0 for max speed")
+@click.option("--gap-rate", default=0.0, help="probability of answering 404")
+@click.option("--latency", default=0.0, help="seconds added to every response")
+@click.option("--latency-jitter", default=0.0)
+@click.option("--loop/--no-loop", default=True)
+def serve_replay(
+    path: str,
+    host: str,
+    port: int,
+    clients: int,
+    speed: float,
+    gap_rate: float,
+    latency: float,
+    latency_jitter: float,
+    loop: bool,
+):
+    server = ReplayServer(
+        FileStreamer(path=path),
+        host=host,
+        speed=speed,
+        gap_rate=gap_rate,
+        latency=latency,
+        latency_jitter=latency_jitter,
+        loop=loop,
+    )
+    ports = list(range(port, port + clients))
+    print(f"serving {len(server.frames)} frames on {host} ports {ports}")
+    server.serve_forever(ports)
+    for server_port, stats in server.stats.items():
+        print(f"{server_port}: {stats.served=} {stats.gaps=} {stats.finished=}")
 
 
 cli()
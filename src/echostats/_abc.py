@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from abc import ABC
 from abc import abstractmethod
 from contextlib import AbstractContextManager
@@ -5,14 +7,21 @@ from typing import Callable
 from typing import Iterable
 from typing import Iterator
 from typing import Type
+from typing import TYPE_CHECKING
 from typing import TypeVar
 
-import plotly.graph_objects as go
+from echostats.memory import deep_sizeof
 from echostats.models import ConsumerEvent
-from typing_extensions import Self
+from echostats.models import Transition
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 
 class BaseConsumer(ABC):
+    # out of process consumers run in a worker fed from shared memory
+    out_of_process: bool = False
+
     @abstractmethod
     def consume(self, event: ConsumerEvent) -> None:
         ...
@@ -20,6 +29,22 @@ class BaseConsumer(ABC):
     def get_context_managers(self) -> Iterable[AbstractContextManager]:
         return []
 
+    def memory_usage(self) -> int:
+        return deep_sizeof(self)
+
+
+class BaseTransitionConsumer(BaseConsumer):
+    transition_types: tuple[Type[Transition], ...] = (Transition,)
+
+    def consume(self, event: ConsumerEvent) -> None:
+        for transition in event.transitions:
+            if isinstance(transition, self.transition_types):
+                self.consume_transition(transition, event)
+
+    @abstractmethod
+    def consume_transition(self, transition: Transition, event: ConsumerEvent) -> None:
+        ...
+
 
 def consumer(func: Callable[[ConsumerEvent], None]) -> Type[BaseConsumer]:
     class Wrapped(BaseConsumer):
@@ -52,6 +77,12 @@ class ConsumerMapping(Mapping):
     def __iter__(self) -> Iterator[Type[ConsumerTypeVar]]:
         return iter(self.mapping)
 
+    def memory_usage(self) -> dict[Type[BaseConsumer], int]:
+        return {
+            consumer_class: consumer.memory_usage()
+            for consumer_class, consumer in self.mapping.items()
+        }
+
 
 class ConsumerDependent(ABC):
     @abstractmethod
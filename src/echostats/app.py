@@ -1,79 +1,124 @@
+import json
+import os
+import sys
+from functools import lru_cache
+from typing import Optional
+
 from dash import Dash
 from dash import dcc
 from dash import html
-from echostats import FileStreamer
-from echostats.consumers.disc import DiscPlayingGrapher
-from echostats.consumers.disc import GoalsGrapher
-from echostats.consumers.player import PingGrapher
-from echostats.consumers.player import PlayerDistanceNetworkGrapher
-from echostats.consumers.player import PlayerStatsGrapher
-
-app = Dash(__name__)
+from dash import Input
+from dash import no_update
+from dash import Output
+from dash import State
+from echostats.jobs import GRAPHERS
+from echostats.jobs import JobQueue
+from echostats.jobs import JobStatus
+from echostats.jobs import list_replays
 
 colors = {"background": "#111111", "text": "#7FDBFF"}
 
 
-streamer = FileStreamer("/media/SSD/echostats/test2.echoarena")
-
-goals_grapher = GoalsGrapher()
-ping_grapher = PingGrapher()
-disc_playing_grapher = DiscPlayingGrapher()
-player_stats_grapher = PlayerStatsGrapher()
-player_distance_network_grapher = PlayerDistanceNetworkGrapher()
-streamer.resolve(
-    [
-        goals_grapher,
-        ping_grapher,
-        disc_playing_grapher,
-        player_stats_grapher,
-        player_distance_network_grapher,
-    ]
-)
-
-
-def fig_post_process(fig):
-    fig.update_layout(
+def fig_post_process(fig: dict) -> dict:
+    fig.setdefault("layout", {}).update(
         plot_bgcolor=colors["background"],
         paper_bgcolor=colors["background"],
-        font_color=colors["text"],
+        font={"color": colors["text"]},
     )
     return fig
 
 
-app.layout = html.Div(
-    style={"backgroundColor": colors["background"]},
-    children=[
-        html.H1(
-            children="Hello Dash",
-            style={"textAlign": "center", "color": colors["text"]},
-        ),
-        html.Div(
-            children="Dash: A web application framework for your data.",
-            style={"textAlign": "center", "color": colors["text"]},
-        ),
-        dcc.Graph(
-            id="example-graph-2",
-            figure=fig_post_process(goals_grapher.generate_figure()),
-        ),
-        dcc.Graph(
-            id="example-graph-4",
-            figure=fig_post_process(disc_playing_grapher.generate_figure()),
-        ),
-        dcc.Graph(
-            id="example-graph-5",
-            figure=fig_post_process(ping_grapher.generate_figure()),
-        ),
-        dcc.Graph(
-            id="example-graph-6",
-            figure=fig_post_process(player_stats_grapher.generate_figure()),
-        ),
-        dcc.Graph(
-            id="example-graph-7",
-            figure=fig_post_process(player_distance_network_grapher.generate_figure()),
-        ),
-    ],
-)
+def create_app(replay_dir: str, queue: Optional[JobQueue] = None) -> Dash:
+    app = Dash(__name__)
+
+    @lru_cache(maxsize=None)
+    def get_queue() -> JobQueue:
+        # built on first use, the debug reloader's watcher process never serves one
+        return queue if queue is not None else JobQueue()
+
+    text_style = {"textAlign": "center", "color": colors["text"]}
+
+    app.layout = html.Div(
+        style={"backgroundColor": colors["background"]},
+        children=[
+            html.H1(children="echostats", style=text_style),
+            dcc.Dropdown(
+                id="replay",
+                options=[
+                    {"label": os.path.basename(path), "value": path}
+                    for path in list_replays(replay_dir)
+                ],
+            ),
+            html.Button("Analyze", id="analyze"),
+            html.Button("Cancel", id="cancel"),
+            html.Div(id="status", style=text_style),
+            html.Progress(id="progress", value="0", max="1", style={"width": "100%"}),
+            dcc.Store(id="job-id"),
+            dcc.Store(id="shown-job-id"),
+            dcc.Interval(id="poll", interval=1000),
+            html.Div(id="graphs"),
+        ],
+    )
+
+    @app.callback(
+        Output("job-id", "data"),
+        Input("analyze", "n_clicks"),
+        State("replay", "value"),
+        prevent_initial_call=True,
+    )
+    def analyze(n_clicks: Optional[int], path: Optional[str]):
+        if path is None:
+            return no_update
+        return get_queue().submit(path).id
+
+    @app.callback(
+        Output("cancel", "n_clicks"),
+        Input("cancel", "n_clicks"),
+        State("job-id", "data"),
+        prevent_initial_call=True,
+    )
+    def cancel(n_clicks: Optional[int], job_id: Optional[str]):
+        if job_id is not None:
+            get_queue().cancel(job_id)
+        return no_update
+
+    @app.callback(
+        Output("status", "children"),
+        Output("progress", "value"),
+        Output("graphs", "children"),
+        Output("shown-job-id", "data"),
+        Input("poll", "n_intervals"),
+        State("job-id", "data"),
+        State("shown-job-id", "data"),
+    )
+    def poll(n_intervals: Optional[int], job_id: Optional[str], shown: Optional[str]):
+        job = get_queue().get(job_id) if job_id is not None else None
+        if job is None:
+            return "pick a replay", "0", no_update, no_update
+        status = job.status
+        message = f"{os.path.basename(job.key.path)}: {status.value}"
+        if status == JobStatus.FAILED:
+            message += f" {job.error}"
+        result = job.result
+        if result is not None:
+            message += ", rendered in " + ", ".join(
+                f"{name} {seconds:.2f}s"
+                for name, seconds in sorted(
+                    result.timings.items(), key=lambda i: i[1], reverse=True
+                )
+            )
+        if result is None or shown == job.id:
+            # figures are only sent once per finished job
+            return message, str(job.progress), no_update, no_update
+        graphs = [
+            dcc.Graph(id=f"graph-{name}", figure=fig_post_process(json.loads(figure)))
+            for name, figure in result.figures.items()
+            if name in GRAPHERS
+        ]
+        return message, "1", graphs, job.id
+
+    return app
 
 
 if __name__ == "__main__":
-    app.run_server(debug=True)
+    create_app(sys.argv[1] if len(sys.argv) > 1 else ".").run_server(debug=True)
@@ -0,0 +1,117 @@
+import marshal
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Generator
+from typing import Hashable
+from typing import Optional
+
+from echostats.models import EchoEvent
+from echostats.models import StreamEvent
+from echostats.packing import pack_datetime
+from echostats.packing import pack_values
+from echostats.packing import unpack_datetime
+from echostats.packing import unpack_values
+
+DEFAULT_ARENA_BYTES = 512 << 20
+
+
+def encode_frame(stream_event: StreamEvent, echo_event: EchoEvent) -> bytes:
+    # only the parsed frame is kept, replayed stream events carry no raw data
+    return zlib.compress(
+        marshal.dumps(
+            (
+                pack_datetime(stream_event.datetime),
+                stream_event.sent,
+                stream_event.received,
+                pack_values(echo_event),
+            )
+        ),
+        1,
+    )
+
+
+def decode_frame(blob: bytes) -> tuple[StreamEvent, EchoEvent]:
+    micros, sent, received, values = marshal.loads(zlib.decompress(blob))
+    stream_event = StreamEvent.construct(
+        data=b"", datetime=unpack_datetime(micros), sent=sent, received=received
+    )
+    return stream_event, unpack_values(values)
+
+
+class ArenaWriter:
+    # collects the frames of one full read, a partial read is never stored
+    def __init__(self, arena: "FrameArena", key: Hashable):
+        self.arena = arena
+        self.key = key
+        self.frames: Optional[list[bytes]] = []
+        self.size = 0
+
+    def add(self, stream_event: StreamEvent, echo_event: EchoEvent) -> None:
+        if self.frames is None:
+            return
+        blob = encode_frame(stream_event, echo_event)
+        self.size += len(blob)
+        if self.size > self.arena.max_bytes:
+            # larger than the whole arena, stop paying for the encoding
+            self.frames = None
+            return
+        self.frames.append(blob)
+
+    def commit(self) -> None:
+        if self.frames is not None:
+            self.arena.put(self.key, self.frames, self.size)
+
+
+class FrameArena:
+    def __init__(self, max_bytes: int = DEFAULT_ARENA_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[list[bytes], int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[list[bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, frames: list[bytes], size: int) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (frames, size)
+            self.size += size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def writer(self, key: Hashable) -> ArenaWriter:
+        return ArenaWriter(self, key)
+
+    def replay(
+        self, frames: list[bytes]
+    ) -> Generator[tuple[StreamEvent, EchoEvent], None, None]:
+        for blob in frames:
+            yield decode_frame(blob)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+default_arena = FrameArena()
@@ -0,0 +1,174 @@
+import json
+import queue
+import socket
+import threading
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Type
+
+from echostats._abc import BaseConsumer
+from echostats.models import ConsumerEvent
+
+KEEPALIVE_SECONDS = 15.0
+
+
+class Subscriber:
+    def __init__(self, summary: bool, buffer_size: int, connection: socket.socket):
+        self.summary = summary
+        self.queue: queue.Queue[bytes] = queue.Queue(maxsize=buffer_size)
+        self.connection = connection
+        self.dropped = False
+
+    def drop(self) -> None:
+        self.dropped = True
+        try:
+            # unblocks a handler stuck writing to a client that stopped reading
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def summarize(event: ConsumerEvent) -> dict:
+    echo_event = event.echo_event
+    poss = echo_event.possession
+    disc = echo_event.disc
+    return {
+        "datetime": event.stream_event.datetime.isoformat(sep=" "),
+        "sessionid": None
+        if echo_event.sessionid is None
+        else str(echo_event.sessionid),
+        "game_status": None
+        if echo_event.game_status is None
+        else echo_event.game_status.value,
+        "game_clock_display": echo_event.game_clock_display,
+        "blue_points": echo_event.blue_points,
+        "orange_points": echo_event.orange_points,
+        "possession": None if poss is None else [poss.team, poss.player],
+        "disc": None
+        if disc is None
+        else [disc.position.x, disc.position.y, disc.position.z],
+    }
+
+
+class BroadcastConsumer(BaseConsumer):
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 6722, buffer_size: int = 64
+    ):
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.latest: Optional[bytes] = None
+        self.dropped = 0
+        self._subscribers: list[Subscriber] = []
+        self._lock = threading.Lock()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, summary: bool, connection: socket.socket) -> Subscriber:
+        subscriber = Subscriber(
+            summary=summary, buffer_size=self.buffer_size, connection=connection
+        )
+        with self._lock:
+            self._subscribers = self._subscribers + [subscriber]
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers = [i for i in self._subscribers if i is not subscriber]
+
+    def consume(self, event: ConsumerEvent) -> None:
+        data = event.stream_event.data
+        self.latest = data if isinstance(data, bytes) else data.encode()
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        frame_message = b"data: " + self.latest + b"\n\n"
+        summary_message = None
+        for subscriber in subscribers:
+            if subscriber.summary:
+                if summary_message is None:
+                    summary_message = (
+                        b"data: " + json.dumps(summarize(event)).encode() + b"\n\n"
+                    )
+                message = summary_message
+            else:
+                message = frame_message
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                # a slow client must never stall the poller, it gets disconnected
+                subscriber.drop()
+                self.dropped += 1
+                self.unsubscribe(subscriber)
+
+    def _make_handler(self) -> Type[BaseHTTPRequestHandler]:
+        broadcast = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/session":
+                    self._send_latest()
+                elif self.path in ("/frames", "/summary"):
+                    self._stream(summary=self.path == "/summary")
+                else:
+                    self.send_error(404)
+
+            def _send_latest(self) -> None:
+                latest = broadcast.latest
+                if latest is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(latest)))
+                self.end_headers()
+                self.wfile.write(latest)
+
+            def _stream(self, summary: bool) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                subscriber = broadcast.subscribe(summary, self.connection)
+                try:
+                    while not subscriber.dropped:
+                        try:
+                            message = subscriber.queue.get(timeout=KEEPALIVE_SECONDS)
+                        except queue.Empty:
+                            message = b": keepalive\n\n"
+                        self.wfile.write(message)
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    broadcast.unsubscribe(subscriber)
+
+            def log_message(self, format: str, *args) -> None:
+                ...
+
+        return Handler
+
+    @contextmanager
+    def _serve(self) -> Iterator[None]:
+        server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            for subscriber in self._subscribers:
+                subscriber.drop()
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    def get_context_managers(self) -> Iterable[AbstractContextManager]:
+        return [self._serve()]
@@ -1,7 +1,164 @@
+from __future__ import annotations
+
+import queue
+import sys
+import threading
+import time
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import TextIO
+from typing import TYPE_CHECKING
+
 from echostats._abc import BaseConsumer
 from echostats.models import ConsumerEvent
 
+if TYPE_CHECKING:
+    from echostats.streamer import BaseStreamer
+
+# seconds the writer gets to drain its queue once the stream ends
+CLOSE_TIMEOUT = 1.0
+
+
+def select_field(value: Any, path: str) -> Any:
+    # dotted attribute path, integers index into lists: "teams.0.players"
+    for part in path.split("."):
+        if value is None:
+            return None
+        if part.isdigit():
+            try:
+                value = value[int(part)]
+            except (IndexError, KeyError, TypeError):
+                # out of range, or not indexable at all like a Vector3D
+                return None
+        else:
+            value = getattr(value, part, None)
+    return value
+
 
 class DebuggerConsumer(BaseConsumer):
+    def __init__(
+        self,
+        interval: Optional[float] = 1.0,
+        fields: Optional[list[str]] = None,
+        summary_interval: Optional[float] = 5.0,
+        streamer: Optional[BaseStreamer] = None,
+        stream: TextIO = sys.stdout,
+        buffer_size: int = 256,
+    ):
+        # at most one frame every `interval` seconds is printed, None prints all
+        self.interval = interval
+        self.fields = fields
+        self.summary_interval = summary_interval
+        self.streamer = streamer
+        self.stream = stream
+        self.frames = 0
+        self.dropped = 0
+        self._queue: queue.Queue[Optional[tuple[str, Any]]] = queue.Queue(
+            maxsize=buffer_size
+        )
+        self._last_sample: Optional[float] = None
+        self._latest: Optional[ConsumerEvent] = None
+
+    def _put(self, item: tuple[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # the capture loop never waits on the terminal
+            self.dropped += 1
+
     def consume(self, event: ConsumerEvent) -> None:
-        print(repr(event.echo_event))
+        self.frames += 1
+        self._latest = event
+        now = time.monotonic()
+        if (
+            self.interval is None
+            or self._last_sample is None
+            or now - self._last_sample >= self.interval
+        ):
+            self._last_sample = now
+            self._put(("frame", event))
+
+    def format_frame(self, event: ConsumerEvent) -> str:
+        if self.fields is None:
+            return repr(event.echo_event)
+        return " ".join(
+            f"{field}={select_field(event.echo_event, field)!r}"
+            for field in self.fields
+        )
+
+    def format_summary(self, elapsed: float, frames: int) -> str:
+        line = f"{frames / elapsed:.1f} frames/s"
+        if self._latest is not None:
+            echo_event = self._latest.echo_event
+            status = echo_event.game_status
+            line += (
+                f" blue {echo_event.blue_points} - {echo_event.orange_points} orange"
+                f" clock={echo_event.game_clock_display}"
+                f" status={None if status is None else status.value}"
+            )
+        for counter in ("polls", "unavailable"):
+            if hasattr(self.streamer, counter):
+                line += f" {counter}={getattr(self.streamer, counter)}"
+        if self.dropped:
+            line += f" dropped={self.dropped}"
+        return line
+
+    def _write_line(self, kind: str, value: Any) -> None:
+        try:
+            if kind == "frame":
+                line = self.format_frame(value)
+            else:
+                line = self.format_summary(*value)
+        except Exception as error:
+            # a dead writer would leave the capture blocked on a full queue
+            line = f"cannot print {kind}: {error!r}"
+        self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def _write(self) -> None:
+        # summaries run on their own clock, so they keep coming while no frame does
+        last_summary = time.monotonic()
+        last_frames = 0
+        while True:
+            timeout = None
+            if self.summary_interval is not None:
+                timeout = max(
+                    last_summary + self.summary_interval - time.monotonic(), 0
+                )
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                if item is None:
+                    return
+                self._write_line(*item)
+            now = time.monotonic()
+            if (
+                self.summary_interval is not None
+                and now - last_summary >= self.summary_interval
+            ):
+                frames = self.frames
+                self._write_line("summary", (now - last_summary, frames - last_frames))
+                last_summary = now
+                last_frames = frames
+
+    @contextmanager
+    def _writer(self) -> Iterator[None]:
+        thread = threading.Thread(target=self._write, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            try:
+                self._queue.put(None, timeout=CLOSE_TIMEOUT)
+            except queue.Full:
+                pass
+            thread.join(timeout=CLOSE_TIMEOUT)
+
+    def get_context_managers(self) -> Iterable[AbstractContextManager]:
+        return [self._writer()]
@@ -1,26 +1,41 @@
+from __future__ import annotations
+
+import base64
+import functools
 import os
+from typing import Hashable
 from typing import Iterable
 from typing import Optional
 from typing import Type
+from typing import TYPE_CHECKING
 from typing import TypedDict
 
-import pandas as pd
-import plotly.graph_objects as go
 from echostats._abc import BaseConsumer
 from echostats._abc import BaseGrapher
+from echostats._abc import BaseTransitionConsumer
 from echostats._abc import ConsumerDependent
 from echostats._abc import ConsumerMapping
 from echostats.models import ConsumerEvent
 from echostats.models import Disc
 from echostats.models import EchoEvent
 from echostats.models import GameStatus
+from echostats.models import GoalScored
 from echostats.models import Player
 from echostats.models import Vector3D
-from PIL import Image
-from plotly.subplots import make_subplots
+from echostats.resample import resample
+from echostats.resample import ResampledSeries
+from echostats.resample import Timeline
+from echostats.retention import RetainedSeries
+from echostats.retention import Retention
+from echostats.retention import Rollup
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
 
+class GoalsConsumer(BaseTransitionConsumer):
+    transition_types = (GoalScored,)
 
-class GoalsConsumer(BaseConsumer):
     def __init__(
         self, perspective_of_striker: bool = True, perspective_of_goalie: bool = False
     ):
@@ -44,23 +59,18 @@ class GoalsConsumer(BaseConsumer):
         self._orange_goals: list[Vector3D] = list()
         self._blue_goals: list[Vector3D] = list()
 
-    def consume(self, event: ConsumerEvent) -> None:
-        match event.echo_event:
-            case EchoEvent(
-                game_status=None,
-                last_score=_,
-            ):
-                disc = event.echo_event.disc
-                if disc is None:
-                    pass
-                elif round(disc.position.z) == 36:
-                    pos = disc.position.copy()
-                    pos.x *= self.orange_x_factor
-                    self._orange_goals.append(pos)
-                elif round(disc.position.z) == -36:
-                    pos = disc.position.copy()
-                    pos.y *= self.blue_x_factor
-                    self._blue_goals.append(pos)
+    def consume_transition(self, transition: GoalScored, event: ConsumerEvent) -> None:
+        disc_position = transition.disc_position
+        if disc_position is None:
+            pass
+        elif disc_position.z > 0:
+            pos = disc_position.copy()
+            pos.x *= self.orange_x_factor
+            self._orange_goals.append(pos)
+        else:
+            pos = disc_position.copy()
+            pos.y *= self.blue_x_factor
+            self._blue_goals.append(pos)
 
     @property
     def orange_goals(self) -> list[Vector3D]:
@@ -81,6 +91,8 @@ class GoalsGrapher(BaseGrapher, ConsumerDependent):
     def create_per_team_plot(
         self, goals: list[Vector3D], color: str, fig: go.Figure, row: int, col: int
     ) -> go.Figure:
+        import plotly.graph_objects as go
+
         if len(goals) > 0:
             fig.add_scatter(
                 x=[i.x for i in goals],
@@ -118,6 +130,8 @@ class GoalsGrapher(BaseGrapher, ConsumerDependent):
         return fig
 
     def generate_figure(self) -> go.Figure:
+        from plotly.subplots import make_subplots
+
         fig = make_subplots(
             rows=1,
             cols=2,
@@ -155,13 +169,19 @@ class DiscPlayingStruct(TypedDict):
     disc: Disc
     player_name: Optional[str]
     team_name: Optional[str]
+    userid: Optional[int]
 
 
 class DiscPlayingConsumer(BaseConsumer):
-    def __init__(self):
-        self._disc_positions = []
+    def __init__(self, retention: Optional[Retention] = None):
+        self._retention = retention if retention is not None else Retention()
+        self._disc_positions: RetainedSeries[
+            DiscPlayingStruct
+        ] = self._retention.series("disc")
 
     def consume(self, event: ConsumerEvent) -> None:
+        if self._retention.observe(event):
+            self._disc_positions = self._retention.series("disc")
         match event.echo_event:
             case EchoEvent(
                 game_status=GameStatus.PLAYING,
@@ -174,30 +194,97 @@ class DiscPlayingConsumer(BaseConsumer):
                         and poss.player is not None
                     ):
                         team = event.echo_event.teams[poss.team]
-                        player_name = team.players[poss.player].name
+                        player = team.players[poss.player]
+                        player_name = player.name
+                        userid = player.userid
                         team_name = {"BLUE TEAM": "blue", "ORANGE TEAM": "orange"}[
                             team.name
                         ]
                     else:
                         player_name = None
+                        userid = None
                         team_name = None
 
-                    self._disc_positions.append(
-                        DiscPlayingStruct(
-                            disc=event.echo_event.disc,
-                            player_name=player_name,
-                            team_name=team_name,
-                        )
+                    self._disc_positions[
+                        event.stream_event.datetime
+                    ] = DiscPlayingStruct(
+                        disc=event.echo_event.disc,
+                        player_name=player_name,
+                        team_name=team_name,
+                        userid=userid,
                     )
 
     @property
     def disc_positions(self) -> list[DiscPlayingStruct]:
-        return [i.copy() for i in self._disc_positions]
+        return [i.copy() for i in self._disc_positions.values()]
+
+    def resample(
+        self, rate: float = 10, max_gap: float = 0.5
+    ) -> tuple[Timeline, ResampledSeries]:
+        positions = {
+            dtime: i["disc"].position for dtime, i in self._disc_positions.items()
+        }
+        timeline = Timeline.covering([positions], rate)
+        return timeline, resample(positions, timeline, max_gap=max_gap)
+
+    @property
+    def rollups(self) -> dict[Hashable, Rollup]:
+        return self._retention.rollups
 
 
 app_path = os.path.dirname(os.path.abspath(__file__))
 
 
+@functools.lru_cache(maxsize=None)
+def load_arena_background() -> str:
+    # the asset is a PNG already, plotly would decode and re-encode a PIL image
+    with open(
+        os.path.join(app_path, "../assets/sean-ian-runnels-echo-arena-003.png"), "rb"
+    ) as image_file:
+        return "data:image/png;base64," + base64.b64encode(image_file.read()).decode()
+
+
+def add_arena_background(fig: go.Figure, opacity: float = 0.5) -> go.Figure:
+    fig.update_yaxes(
+        scaleanchor="x",
+        scaleratio=1,
+    )
+    y = 16
+    fig.add_layout_image(
+        dict(
+            source=load_arena_background(),
+            xref="x",
+            yref="y",
+            x=-40,
+            y=y,
+            sizex=80,
+            sizey=y * 2,
+            sizing="stretch",
+            opacity=opacity,
+            layer="below",
+        )
+    )
+
+    fig.update_yaxes(
+        visible=False,
+        range=(-16, 16),
+    )
+    fig.update_xaxes(
+        visible=False,
+        range=(-40, 40),
+    )
+
+    # Set templates
+    fig.update_layout(
+        xaxis_showgrid=False,
+        yaxis_showgrid=False,
+        xaxis_zeroline=False,
+        yaxis_zeroline=False,
+        template="plotly_white",
+    )
+    return fig
+
+
 class DiscPlayingGrapher(BaseGrapher, ConsumerDependent):
     def get_dependencies(self) -> Iterable[Type[BaseConsumer]]:
         return (DiscPlayingConsumer,)
@@ -206,6 +293,8 @@ class DiscPlayingGrapher(BaseGrapher, ConsumerDependent):
         self.disc_playing_consumer = dependencies[DiscPlayingConsumer]
 
     def generate_figure(self) -> go.Figure:
+        import plotly.graph_objects as go
+
         discs_struct = self.disc_playing_consumer.disc_positions
         fig = go.Figure()
 
@@ -214,45 +303,4 @@ class DiscPlayingGrapher(BaseGrapher, ConsumerDependent):
             y=[i["disc"].position.x for i in discs_struct],
             mode="lines+markers",
         )
-        fig.update_yaxes(
-            scaleanchor="x",
-            scaleratio=1,
-        )
-        y = 16
-        fig.add_layout_image(
-            dict(
-                source=Image.open(
-                    os.path.join(
-                        app_path, "../assets/sean-ian-runnels-echo-arena-003.png"
-                    )
-                ),
-                xref="x",
-                yref="y",
-                x=-40,
-                y=y,
-                sizex=80,
-                sizey=y * 2,
-                sizing="stretch",
-                opacity=0.5,
-                layer="below",
-            )
-        )
-
-        fig.update_yaxes(
-            visible=False,
-            range=(-16, 16),
-        )
-        fig.update_xaxes(
-            visible=False,
-            range=(-40, 40),
-        )
-
-        # Set templates
-        fig.update_layout(
-            xaxis_showgrid=False,
-            yaxis_showgrid=False,
-            xaxis_zeroline=False,
-            yaxis_zeroline=False,
-            template="plotly_white",
-        )
-        return fig
+        return add_arena_background(fig)
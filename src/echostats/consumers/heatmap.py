@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+from typing import Type
+from typing import TYPE_CHECKING
+
+import numpy as np
+from echostats._abc import BaseConsumer
+from echostats._abc import BaseGrapher
+from echostats._abc import ConsumerDependent
+from echostats._abc import ConsumerMapping
+from echostats.consumers.disc import add_arena_background
+from echostats.models import ConsumerEvent
+from echostats.models import GameStatus
+from echostats.models import Vector3D
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+ARENA_BOUNDS = ((-16.0, 16.0), (-8.0, 8.0), (-40.0, 40.0))
+
+
+class HeatmapGrid:
+    def __init__(
+        self,
+        bounds: tuple[tuple[float, float], ...] = ARENA_BOUNDS,
+        cell_size: float = 1.0,
+    ):
+        self.bounds = bounds
+        self.cell_size = cell_size
+        self.shape = tuple(
+            max(1, int(np.ceil((high - low) / cell_size))) for low, high in bounds
+        )
+        self.counts = np.zeros(self.shape, dtype=np.uint32)
+
+    def _index(self, value: float, axis: int) -> int:
+        low = self.bounds[axis][0]
+        i = int((value - low) // self.cell_size)
+        return min(max(i, 0), self.shape[axis] - 1)
+
+    def add(self, position: Vector3D) -> None:
+        self.counts[
+            self._index(position.x, 0),
+            self._index(position.y, 1),
+            self._index(position.z, 2),
+        ] += 1
+
+    def is_compatible(self, other: HeatmapGrid) -> bool:
+        return self.bounds == other.bounds and self.cell_size == other.cell_size
+
+    def merge(self, other: HeatmapGrid) -> HeatmapGrid:
+        if not self.is_compatible(other):
+            raise ValueError("can only merge heatmap grids with the same layout")
+        self.counts += other.counts
+        return self
+
+    def copy(self) -> HeatmapGrid:
+        grid = HeatmapGrid(bounds=self.bounds, cell_size=self.cell_size)
+        grid.counts = self.counts.copy()
+        return grid
+
+    def axis_centers(self, axis: int) -> np.ndarray:
+        low = self.bounds[axis][0]
+        return low + (np.arange(self.shape[axis]) + 0.5) * self.cell_size
+
+    @property
+    def top_down(self) -> np.ndarray:
+        # (x, z) plane, summed over the height axis
+        return self.counts.sum(axis=1)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+
+class HeatmapKey(NamedTuple):
+    phase: Optional[GameStatus]
+    team_name: Optional[str]
+    userid: Optional[int]
+
+
+class BaseHeatmapConsumer(BaseConsumer):
+    def __init__(self, cell_size: float = 1.0):
+        self.cell_size = cell_size
+        self._grids: dict[HeatmapKey, HeatmapGrid] = {}
+        # latest name of every userid, grids are keyed on the userid
+        self.names: dict[int, str] = {}
+
+    def _add(self, key: HeatmapKey, position: Vector3D) -> None:
+        grid = self._grids.get(key)
+        if grid is None:
+            grid = self._grids[key] = HeatmapGrid(cell_size=self.cell_size)
+        grid.add(position)
+
+    def merge(self, other: BaseHeatmapConsumer) -> BaseHeatmapConsumer:
+        for key, grid in other._grids.items():
+            if key in self._grids:
+                self._grids[key].merge(grid)
+            else:
+                self._grids[key] = grid.copy()
+        self.names.update(other.names)
+        return self
+
+    @property
+    def keys(self) -> list[HeatmapKey]:
+        return list(self._grids.keys())
+
+    def get_grid(
+        self,
+        phase: Optional[GameStatus] = None,
+        team_name: Optional[str] = None,
+        player_name: Optional[str] = None,
+        userid: Optional[int] = None,
+    ) -> HeatmapGrid:
+        # None acts as a wildcard, matching grids are summed together
+        result = HeatmapGrid(cell_size=self.cell_size)
+        for key, grid in self._grids.items():
+            if phase is not None and key.phase != phase:
+                continue
+            if team_name is not None and key.team_name != team_name:
+                continue
+            if userid is not None and key.userid != userid:
+                continue
+            if player_name is not None and self.names.get(key.userid) != player_name:
+                continue
+            result.merge(grid)
+        return result
+
+
+class PlayerHeatmapConsumer(BaseHeatmapConsumer):
+    def consume(self, event: ConsumerEvent) -> None:
+        phase = event.echo_event.game_status
+        for team in event.echo_event.teams:
+            if team.players is None:
+                continue
+            for player in team.players:
+                self.names[player.userid] = player.name
+                self._add(
+                    HeatmapKey(phase, team.name, player.userid), player.head.position
+                )
+
+
+class DiscHeatmapConsumer(BaseHeatmapConsumer):
+    def consume(self, event: ConsumerEvent) -> None:
+        disc = event.echo_event.disc
+        if disc is not None:
+            self._add(
+                HeatmapKey(event.echo_event.game_status, None, None), disc.position
+            )
+
+
+class HeatmapGrapher(BaseGrapher, ConsumerDependent):
+    def __init__(
+        self,
+        disc: bool = False,
+        phase: Optional[GameStatus] = GameStatus.PLAYING,
+        team_name: Optional[str] = None,
+        player_name: Optional[str] = None,
+    ):
+        self.consumer_class: Type[DiscHeatmapConsumer] | Type[PlayerHeatmapConsumer] = (
+            DiscHeatmapConsumer if disc else PlayerHeatmapConsumer
+        )
+        self.phase = phase
+        self.team_name = team_name
+        self.player_name = player_name
+
+    def get_dependencies(self) -> Iterable[Type[BaseConsumer]]:
+        return (self.consumer_class,)
+
+    def init(self, dependencies: ConsumerMapping) -> None:
+        self.heatmap_consumer = dependencies[self.consumer_class]
+
+    def generate_figure(self) -> go.Figure:
+        import plotly.graph_objects as go
+
+        grid = self.heatmap_consumer.get_grid(
+            phase=self.phase, team_name=self.team_name, player_name=self.player_name
+        )
+        density = grid.top_down.astype(float)
+        fig = go.Figure()
+        fig.add_heatmap(
+            x=grid.axis_centers(2),
+            y=grid.axis_centers(0),
+            z=np.where(density > 0, density, np.nan),
+            colorscale="Hot",
+            reversescale=True,
+            opacity=0.7,
+            hoverongaps=False,
+        )
+        title = (
+            "Disc Heatmap" if self.consumer_class is DiscHeatmapConsumer else "Heatmap"
+        )
+        if self.player_name is not None:
+            title += f" - {self.player_name}"
+        elif self.team_name is not None:
+            title += f" - {self.team_name}"
+        fig.update_layout(title_text=title)
+        return add_arena_background(fig)
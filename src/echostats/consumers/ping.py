@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+from collections import deque
+from datetime import datetime
+from typing import NamedTuple
+from typing import Optional
+from uuid import UUID
+
+from echostats._abc import BaseConsumer
+from echostats.identity import IdentityRegistry
+from echostats.models import ConsumerEvent
+
+MAX_PING = 1023
+
+
+class PingHistogram:
+    # 1ms buckets, anything above max_ping lands in the last one
+    def __init__(self, max_ping: int = MAX_PING):
+        self.max_ping = max_ping
+        # a list, numpy would be loaded on the recording path for a few counters
+        self.counts = [0] * (max_ping + 1)
+
+    def add(self, ping: int) -> None:
+        self.counts[min(max(ping, 0), self.max_ping)] += 1
+
+    def merge(self, other: PingHistogram) -> PingHistogram:
+        if self.max_ping != other.max_ping:
+            raise ValueError("can only merge ping histograms with the same layout")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    def copy(self) -> PingHistogram:
+        histogram = PingHistogram(max_ping=self.max_ping)
+        histogram.counts = self.counts.copy()
+        return histogram
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> Optional[int]:
+        total = self.total
+        if total == 0:
+            return None
+        return bisect.bisect_left(list(itertools.accumulate(self.counts)), q * total)
+
+    @property
+    def mean(self) -> Optional[float]:
+        total = self.total
+        if total == 0:
+            return None
+        return sum(ping * count for ping, count in enumerate(self.counts)) / total
+
+
+class PingSpike(NamedTuple):
+    datetime: datetime
+    ping: int
+    baseline: float
+
+
+class PingStats:
+    def __init__(self, spike_delta: int, max_spikes: int):
+        self.spike_delta = spike_delta
+        self.histogram = PingHistogram()
+        # mean absolute difference between consecutive samples
+        self.jitter = 0.0
+        # smoothed ping the spikes are measured against
+        self.baseline: Optional[float] = None
+        self.spike_count = 0
+        self.spikes: deque[PingSpike] = deque(maxlen=max_spikes)
+        self._previous: Optional[int] = None
+        self._in_spike = False
+        self._deltas = 0
+
+    def add(self, dtime: datetime, ping: int) -> None:
+        self.histogram.add(ping)
+        if self._previous is not None:
+            self._deltas += 1
+            self.jitter += (abs(ping - self._previous) - self.jitter) / self._deltas
+        self._previous = ping
+
+        if self.baseline is None:
+            self.baseline = float(ping)
+            return
+        is_spike = ping - self.baseline >= self.spike_delta
+        if is_spike and not self._in_spike:
+            self.spike_count += 1
+            self.spikes.append(PingSpike(dtime, ping, self.baseline))
+        self._in_spike = is_spike
+        if not is_spike:
+            self.baseline += (ping - self.baseline) / 16
+
+
+class PingStatsKey(NamedTuple):
+    sessionid: Optional[UUID]
+    team_name: str
+    userid: int
+
+
+class PingSummary(NamedTuple):
+    key: PingStatsKey
+    player_name: str
+    samples: int
+    p50: Optional[int]
+    p95: Optional[int]
+    p99: Optional[int]
+    jitter: float
+    spikes: int
+
+
+class PingStatsConsumer(BaseConsumer):
+    def __init__(self, spike_delta: int = 50, max_spikes: int = 32):
+        self.spike_delta = spike_delta
+        self.max_spikes = max_spikes
+        self._stats: dict[PingStatsKey, PingStats] = {}
+        self._identities = IdentityRegistry()
+
+    def consume(self, event: ConsumerEvent) -> None:
+        echo_event = event.echo_event
+        self._identities = event.identities
+        for team in echo_event.teams:
+            for player in team.players or []:
+                # a rename keeps the player's history, names are resolved on display
+                key = PingStatsKey(echo_event.sessionid, team.name, player.userid)
+                stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = PingStats(
+                        self.spike_delta, self.max_spikes
+                    )
+                stats.add(event.stream_event.datetime, player.ping)
+
+    @property
+    def stats(self) -> dict[PingStatsKey, PingStats]:
+        return self._stats
+
+    def get_histogram(
+        self,
+        sessionid: Optional[UUID] = None,
+        team_name: Optional[str] = None,
+        player_name: Optional[str] = None,
+        userid: Optional[int] = None,
+    ) -> PingHistogram:
+        # None acts as a wildcard, matching histograms are merged together
+        result = PingHistogram()
+        for key, stats in self._stats.items():
+            if sessionid is not None and key.sessionid != sessionid:
+                continue
+            if team_name is not None and key.team_name != team_name:
+                continue
+            if userid is not None and key.userid != userid:
+                continue
+            if (
+                player_name is not None
+                and self._identities.label(key.userid) != player_name
+            ):
+                continue
+            result.merge(stats.histogram)
+        return result
+
+    def summary(self) -> list[PingSummary]:
+        return [
+            PingSummary(
+                key=key,
+                player_name=self._identities.label(key.userid),
+                samples=stats.histogram.total,
+                p50=stats.histogram.quantile(0.50),
+                p95=stats.histogram.quantile(0.95),
+                p99=stats.histogram.quantile(0.99),
+                jitter=stats.jitter,
+                spikes=stats.spike_count,
+            )
+            for key, stats in self._stats.items()
+        ]
@@ -1,53 +1,129 @@
+from __future__ import annotations
+
 import math
-from datetime import datetime
 from math import ceil
+from typing import Hashable
 from typing import Iterable
+from typing import Optional
 from typing import Type
+from typing import TYPE_CHECKING
 
-import pandas as pd
-import plotly.express as xp
-import plotly.graph_objects as go
+import numpy as np
 from echostats._abc import BaseConsumer
 from echostats._abc import BaseGrapher
+from echostats._abc import BaseTransitionConsumer
 from echostats._abc import ConsumerDependent
 from echostats._abc import ConsumerMapping
+from echostats.consumers.ping import PingStatsConsumer
+from echostats.identity import IdentityRegistry
+from echostats.identity import PlayerTable
 from echostats.models import ConsumerEvent
 from echostats.models import EchoEvent
 from echostats.models import GameStatus
+from echostats.models import GameStatusChanged
+from echostats.models import PlayerJoined
+from echostats.models import PossessionChanged
+from echostats.models import StatIncrement
 from echostats.models import Stats
+from echostats.models import Transition
 from echostats.models import Vector3D
-from plotly.subplots import make_subplots
+from echostats.resample import resample_all
+from echostats.resample import ResampledSeries
+from echostats.resample import Timeline
+from echostats.retention import RetainedSeries
+from echostats.retention import Retention
+from echostats.retention import Rollup
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 
 class PingConsumer(BaseConsumer):
-    def __init__(self):
-        self._teams: dict[str, dict[str, dict[datetime, int]]] = {}
+    def __init__(self, retention: Optional[Retention] = None):
+        self._retention = retention if retention is not None else Retention()
+        self._identities = IdentityRegistry()
+        self._table: PlayerTable[RetainedSeries[int]] = PlayerTable(
+            self._retention.series
+        )
 
     def consume(self, event: ConsumerEvent) -> None:
+        if self._retention.observe(event):
+            self._table.clear()
+        identities = self._identities = event.identities
         for team in event.echo_event.teams:
             players = team.players if team.players is not None else []
-            if team.name not in self._teams:
-                self._teams[team.name] = {}
+            team_id = identities.team_id(team.name)
             for player in players:
-                if player.name not in self._teams[team.name]:
-                    self._teams[team.name][player.name] = {}
-                self._teams[team.name][player.name][
+                self._table.get(identities, team_id, identities.player_id(player))[
                     event.stream_event.datetime
                 ] = player.ping
 
     @property
-    def pings(self) -> dict[str, dict[str, dict[datetime, int]]]:
-        return self._teams
+    def pings(self) -> dict[str, dict[str, RetainedSeries[int]]]:
+        return self._table.named(self._identities)
+
+    @property
+    def rollups(self) -> dict[Hashable, Rollup]:
+        return self._retention.rollups
 
 
 class PingGrapher(BaseGrapher, ConsumerDependent):
+    def __init__(self, summary: bool = False):
+        # the summary view only needs the bounded ping sketches
+        self.summary = summary
+
     def get_dependencies(self) -> Iterable[Type[BaseConsumer]]:
+        if self.summary:
+            return (PingStatsConsumer,)
         return (PingConsumer,)
 
     def init(self, dependencies: ConsumerMapping) -> None:
-        self.ping_consumer = dependencies[PingConsumer]
+        if self.summary:
+            self.ping_stats_consumer = dependencies[PingStatsConsumer]
+        else:
+            self.ping_consumer = dependencies[PingConsumer]
+
+    def generate_summary_figure(self) -> go.Figure:
+        import plotly.graph_objects as go
+
+        summaries = sorted(
+            self.ping_stats_consumer.summary(),
+            key=lambda i: (i.key.team_name, i.player_name),
+        )
+        labels = [
+            f"{i.player_name} ({i.key.sessionid})"
+            if len({j.key.sessionid for j in summaries}) > 1
+            else i.player_name
+            for i in summaries
+        ]
+        fig = go.Figure()
+        for quantile in ("p50", "p95", "p99"):
+            fig.add_trace(
+                go.Bar(
+                    name=quantile,
+                    x=labels,
+                    y=[getattr(i, quantile) for i in summaries],
+                )
+            )
+        fig.add_trace(
+            go.Scatter(
+                name="jitter",
+                x=labels,
+                y=[i.jitter for i in summaries],
+                mode="markers",
+                text=[f"{i.spikes} spikes" for i in summaries],
+            )
+        )
+        fig.update_layout(barmode="group", title="Players' Ping Summary")
+        return fig
 
     def generate_figure(self) -> go.Figure:
+        if self.summary:
+            return self.generate_summary_figure()
+
+        import pandas as pd
+        import plotly.express as xp
+
         data = []
         for team_name, players in self.ping_consumer.pings.items():
             for player_name, player_pings in players.items():
@@ -60,21 +136,62 @@ class PingGrapher(BaseGrapher, ConsumerDependent):
         return fig
 
 
-class PlayerStatsConsumer(BaseConsumer):
-    def __init__(self):
-        self._teams: dict[str, dict[str, Stats]] = {}
+class PlayerStatsConsumer(BaseTransitionConsumer):
+    # possession_time moves on every frame, it is refreshed whenever the holder
+    # changes and at every game status change instead
+    transition_types = (
+        PlayerJoined,
+        StatIncrement,
+        PossessionChanged,
+        GameStatusChanged,
+    )
 
-    def consume(self, event: ConsumerEvent) -> None:
+    def __init__(self):
+        self._identities = IdentityRegistry()
+        # team name and stats per userid, names are only resolved for display
+        self._stats: dict[int, tuple[str, Stats]] = {}
+
+    def _refresh(
+        self,
+        event: ConsumerEvent,
+        holders: Optional[set[tuple[Optional[str], Optional[str]]]],
+    ) -> None:
+        # None refreshes every player
         for team in event.echo_event.teams:
-            players = team.players if team.players is not None else []
-            if team.name not in self._teams:
-                self._teams[team.name] = {}
-            for player in players:
-                self._teams[team.name][player.name] = player.stats
+            for player in team.players or []:
+                if holders is None or (team.name, player.name) in holders:
+                    self._stats[player.userid] = (team.name, player.stats)
+
+    def consume_transition(self, transition: Transition, event: ConsumerEvent) -> None:
+        self._identities = event.identities
+        match transition:
+            case PlayerJoined() | StatIncrement():
+                self._stats[transition.userid] = (
+                    transition.team_name,
+                    transition.stats,
+                )
+            case PossessionChanged():
+                self._refresh(
+                    event,
+                    {
+                        (
+                            transition.previous_team_name,
+                            transition.previous_player_name,
+                        ),
+                        (transition.current_team_name, transition.current_player_name),
+                    },
+                )
+            case GameStatusChanged():
+                self._refresh(event, None)
 
     @property
     def players_stats(self) -> dict[str, dict[str, Stats]]:
-        return self._teams
+        players_stats: dict[str, dict[str, Stats]] = {}
+        for userid, (team_name, stats) in self._stats.items():
+            players_stats.setdefault(team_name, {})[
+                self._identities.label(userid)
+            ] = stats
+        return players_stats
 
 
 class PlayerStatsGrapher(BaseGrapher, ConsumerDependent):
@@ -85,6 +202,10 @@ class PlayerStatsGrapher(BaseGrapher, ConsumerDependent):
         self.player_stats_consumer = dependencies[PlayerStatsConsumer]
 
     def generate_figure(self) -> go.Figure:
+        import pandas as pd
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
         data = []
         stats_attributes = {
             "Goals": "goals",
@@ -157,37 +278,59 @@ class PlayerStatsGrapher(BaseGrapher, ConsumerDependent):
 
 
 class PlayerPositionConsumer(BaseConsumer):
-    def __init__(self):
-        self._data: dict[str, dict[str, dict[datetime, Vector3D]]] = {}
+    def __init__(self, retention: Optional[Retention] = None):
+        self._retention = retention if retention is not None else Retention()
+        self._identities = IdentityRegistry()
+        self._table: PlayerTable[RetainedSeries[Vector3D]] = PlayerTable(
+            self._retention.series
+        )
 
     def consume(self, event: ConsumerEvent) -> None:
+        if self._retention.observe(event):
+            self._table.clear()
         match event.echo_event:
             case EchoEvent(
                 game_status=GameStatus.PLAYING,
             ):
+                identities = self._identities = event.identities
                 for team in event.echo_event.teams:
-                    if team.name not in self._data:
-                        self._data[team.name] = {}
                     if team.players is None:
                         continue
+                    team_id = identities.team_id(team.name)
                     for player in team.players:
-                        if player.name not in self._data[team.name]:
-                            self._data[team.name][player.name] = {}
+                        self._table.get(
+                            identities, team_id, identities.player_id(player)
+                        )[event.stream_event.datetime] = player.head.position
 
-                        self._data[team.name][player.name][
-                            event.stream_event.datetime
-                        ] = player.head.position
+    @property
+    def data(self) -> dict[str, dict[str, RetainedSeries[Vector3D]]]:
+        return self._table.named(self._identities)
+
+    def resample(
+        self, rate: float = 10, max_gap: float = 0.5
+    ) -> tuple[Timeline, dict[Hashable, ResampledSeries]]:
+        return resample_all(
+            {
+                (team_name, player_name): series
+                for team_name, player_data in self.data.items()
+                for player_name, series in player_data.items()
+            },
+            rate=rate,
+            max_gap=max_gap,
+        )
 
     @property
-    def data(self):
-        return self._data
+    def rollups(self) -> dict[Hashable, Rollup]:
+        return self._retention.rollups
 
 
 class PlayerDistanceNetworkGrapher(BaseGrapher, ConsumerDependent):
     # TODO: this class might need refactoring, or might leave it at his
     player_position_consumer: PlayerPositionConsumer
 
-    def __init__(self):
+    def __init__(self, rate: float = 10, max_gap: float = 0.5):
+        self.rate = rate
+        self.max_gap = max_gap
         self.min_distance: float | None = None
         self.max_distance: float | None = None
 
@@ -197,18 +340,6 @@ class PlayerDistanceNetworkGrapher(BaseGrapher, ConsumerDependent):
     def init(self, dependencies: ConsumerMapping) -> None:
         self.player_position_consumer = dependencies[PlayerPositionConsumer]
 
-    def calculate_distance_3d(self, a: Vector3D, b: Vector3D) -> float:
-        return pow(
-            sum(
-                (
-                    pow(a.x - b.x, 2),
-                    pow(a.y - b.y, 2),
-                    pow(a.z - b.z, 2),
-                )
-            ),
-            0.5,
-        )
-
     def calculate_distance_2d(
         self, a: tuple[float, float], b: tuple[float, float]
     ) -> float:
@@ -247,7 +378,12 @@ class PlayerDistanceNetworkGrapher(BaseGrapher, ConsumerDependent):
         return 1 - ((d - self.min_distance) / (self.max_distance - self.min_distance))
 
     def generate_figure(self) -> go.Figure:
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
 
+        _, resampled = self.player_position_consumer.resample(
+            rate=self.rate, max_gap=self.max_gap
+        )
         adjacency_matrix: dict[str, dict[str, dict[str, float]]] = {}
         for team_name, player_data in self.player_position_consumer.data.items():
             if team_name == "SPECTATORS":
@@ -257,18 +393,18 @@ class PlayerDistanceNetworkGrapher(BaseGrapher, ConsumerDependent):
                 for player_2 in player_names:
                     if player_2 == player_1:
                         continue
-                    player_1_times = set(player_data[player_1].keys())
-                    player_2_times = set(player_data[player_2].keys())
-                    player_shared_times = player_1_times.intersection(player_2_times)
-                    if len(player_shared_times) == 0:
+                    distances = np.linalg.norm(
+                        resampled[team_name, player_1].positions
+                        - resampled[team_name, player_2].positions,
+                        axis=1,
+                    )
+                    shared = (
+                        resampled[team_name, player_1].mask
+                        & resampled[team_name, player_2].mask
+                    )
+                    if not shared.any():
                         continue
-                    all_distances = [
-                        self.calculate_distance_3d(
-                            player_data[player_1][t], player_data[player_2][t]
-                        )
-                        for t in player_shared_times
-                    ]
-                    average_distance = sum(all_distances) / len(all_distances)
+                    average_distance = float(distances[shared].mean())
                     if team_name not in adjacency_matrix:
                         adjacency_matrix[team_name] = {}
                     if player_1 not in adjacency_matrix[team_name]:
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+from datetime import datetime
+from datetime import timedelta
+from enum import Enum
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+from typing import Type
+from typing import TYPE_CHECKING
+
+from echostats._abc import BaseConsumer
+from echostats._abc import BaseGrapher
+from echostats._abc import ConsumerDependent
+from echostats._abc import ConsumerMapping
+from echostats.identity import IdentityRegistry
+from echostats.models import ConsumerEvent
+from echostats.models import EchoEvent
+from echostats.models import GameStatus
+from echostats.models import Throw
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+
+class Holder(NamedTuple):
+    team_name: str
+    # a rename while holding the disc keeps the same holder
+    userid: int
+
+
+class PossessionSegment(NamedTuple):
+    holder: Holder
+    start: datetime
+    end: datetime
+    frames: int
+    start_clock: Optional[timedelta]
+    end_clock: Optional[timedelta]
+
+    @property
+    def duration(self) -> timedelta:
+        return self.end - self.start
+
+
+class PossessionChangeKind(Enum):
+    PASS = "pass"
+    INTERCEPTION = "interception"
+    TURNOVER = "turnover"
+
+
+class PossessionChange(NamedTuple):
+    kind: PossessionChangeKind
+    giver: Holder
+    receiver: Holder
+    datetime: datetime
+    game_clock: Optional[timedelta]
+    thrown: bool
+
+
+class PossessionConsumer(BaseConsumer):
+    def __init__(self):
+        self._identities = IdentityRegistry()
+        self._segments: list[PossessionSegment] = []
+        self._changes: list[PossessionChange] = []
+        self._current: Optional[PossessionSegment] = None
+        self._last_holder: Optional[Holder] = None
+        self._last_throw: Optional[Throw] = None
+        self._thrown = False
+
+    def _get_holder(self, echo_event: EchoEvent) -> Optional[Holder]:
+        poss = echo_event.possession
+        if poss is None or poss.team is None or poss.player is None:
+            return None
+        team = echo_event.teams[poss.team]
+        if team.players is None or poss.player >= len(team.players):
+            return None
+        return Holder(team.name, team.players[poss.player].userid)
+
+    def _close_segment(self) -> None:
+        if self._current is not None:
+            self._segments.append(self._current)
+            self._last_holder = self._current.holder
+            self._current = None
+
+    def _reset(self) -> None:
+        self._close_segment()
+        self._last_holder = None
+        self._thrown = False
+
+    def consume(self, event: ConsumerEvent) -> None:
+        self._identities = event.identities
+        echo_event = event.echo_event
+        if echo_event.game_status != GameStatus.PLAYING:
+            self._reset()
+            return
+
+        throw_seen = (
+            echo_event.last_throw is not None
+            and echo_event.last_throw != self._last_throw
+        )
+        self._last_throw = echo_event.last_throw
+
+        dtime = event.stream_event.datetime
+        clock = echo_event.game_clock
+        holder = self._get_holder(echo_event)
+        current = self._current
+
+        if current is not None and holder == current.holder:
+            self._current = current._replace(
+                end=dtime, frames=current.frames + 1, end_clock=clock
+            )
+            return
+
+        if current is not None:
+            self._close_segment()
+            self._thrown = throw_seen
+        elif throw_seen:
+            self._thrown = True
+
+        if holder is None:
+            return
+
+        giver = self._last_holder
+        if giver is not None and giver != holder:
+            if giver.team_name == holder.team_name:
+                kind = PossessionChangeKind.PASS
+            elif self._thrown:
+                kind = PossessionChangeKind.INTERCEPTION
+            else:
+                kind = PossessionChangeKind.TURNOVER
+            self._changes.append(
+                PossessionChange(
+                    kind=kind,
+                    giver=giver,
+                    receiver=holder,
+                    datetime=dtime,
+                    game_clock=clock,
+                    thrown=self._thrown,
+                )
+            )
+        self._thrown = False
+        self._current = PossessionSegment(
+            holder=holder,
+            start=dtime,
+            end=dtime,
+            frames=1,
+            start_clock=clock,
+            end_clock=clock,
+        )
+
+    def player_name(self, holder: Holder) -> str:
+        return self._identities.label(holder.userid)
+
+    @property
+    def segments(self) -> list[PossessionSegment]:
+        if self._current is None:
+            return list(self._segments)
+        return self._segments + [self._current]
+
+    @property
+    def changes(self) -> list[PossessionChange]:
+        return list(self._changes)
+
+    def _changes_of_kind(self, kind: PossessionChangeKind) -> list[PossessionChange]:
+        return [i for i in self._changes if i.kind == kind]
+
+    @property
+    def passes(self) -> list[PossessionChange]:
+        return self._changes_of_kind(PossessionChangeKind.PASS)
+
+    @property
+    def interceptions(self) -> list[PossessionChange]:
+        return self._changes_of_kind(PossessionChangeKind.INTERCEPTION)
+
+    @property
+    def turnovers(self) -> list[PossessionChange]:
+        return self._changes_of_kind(PossessionChangeKind.TURNOVER)
+
+
+class PossessionGrapher(BaseGrapher, ConsumerDependent):
+    def get_dependencies(self) -> Iterable[Type[BaseConsumer]]:
+        return (PossessionConsumer,)
+
+    def init(self, dependencies: ConsumerMapping) -> None:
+        self.possession_consumer = dependencies[PossessionConsumer]
+
+    def generate_figure(self) -> go.Figure:
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
+        possession_time: dict[Holder, float] = {}
+        for segment in self.possession_consumer.segments:
+            possession_time[segment.holder] = (
+                possession_time.get(segment.holder, 0)
+                + segment.duration.total_seconds()
+            )
+
+        change_counts: dict[str, dict[PossessionChangeKind, int]] = {}
+        for change in self.possession_consumer.changes:
+            team_counts = change_counts.setdefault(change.giver.team_name, {})
+            team_counts[change.kind] = team_counts.get(change.kind, 0) + 1
+
+        fig = make_subplots(
+            rows=1,
+            cols=2,
+            subplot_titles=("Possession Time (s)", "Possession Changes"),
+        )
+        fig.add_trace(
+            go.Bar(
+                x=[
+                    self.possession_consumer.player_name(holder)
+                    for holder in possession_time
+                ],
+                y=list(possession_time.values()),
+                marker=dict(
+                    color=[
+                        "orange" if "orange" in holder.team_name.lower() else "blue"
+                        for holder in possession_time
+                    ]
+                ),
+            ),
+            row=1,
+            col=1,
+        )
+        for kind in PossessionChangeKind:
+            fig.add_trace(
+                go.Bar(
+                    name=kind.value,
+                    x=list(change_counts.keys()),
+                    y=[counts.get(kind, 0) for counts in change_counts.values()],
+                ),
+                row=1,
+                col=2,
+            )
+
+        fig.update_layout(barmode="group", title_text="Possession")
+        return fig
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from datetime import timedelta
+from typing import NamedTuple
+from typing import Optional
+
+from echostats._abc import BaseTransitionConsumer
+from echostats.identity import IdentityRegistry
+from echostats.models import ConsumerEvent
+from echostats.models import EchoEvent
+from echostats.models import GameStatus
+from echostats.models import PossessionChanged
+from echostats.models import StatIncrement
+from echostats.spatial import Neighbour
+from echostats.spatial import SpatialIndex
+from echostats.spatial import SpatialPoint
+
+
+class PlayerDistance(NamedTuple):
+    team_name: str
+    userid: int
+    distance: float
+
+
+class CatchProximity(NamedTuple):
+    datetime: datetime
+    game_clock: Optional[timedelta]
+    team_name: str
+    userid: int
+    nearest_opponent: Optional[PlayerDistance]
+    # opponents with any tracked point within contest_radius of the disc
+    contesters: list[PlayerDistance]
+
+
+class ShotPressure(NamedTuple):
+    datetime: datetime
+    game_clock: Optional[timedelta]
+    team_name: str
+    userid: int
+    defenders: list[PlayerDistance]
+
+
+def _players(neighbours: list[Neighbour]) -> list[PlayerDistance]:
+    # neighbours come sorted, the first point of a player is its closest one
+    players: dict[tuple[str, int], PlayerDistance] = {}
+    for point, distance in neighbours:
+        key = (point.team_name, point.userid)
+        if key not in players:
+            players[key] = PlayerDistance(*key, distance)
+    return list(players.values())
+
+
+def _is_opponent(team_name: str, kind: Optional[str] = None):
+    def where(point: SpatialPoint) -> bool:
+        return (
+            point.team_name is not None
+            and point.team_name != team_name
+            and (kind is None or point.kind == kind)
+        )
+
+    return where
+
+
+def _head(
+    index: SpatialIndex, team_name: str, userid: int
+) -> Optional[tuple[float, float, float]]:
+    for point in index.points:
+        if (
+            point.kind == "head"
+            and point.team_name == team_name
+            and point.userid == userid
+        ):
+            return point.position
+    return None
+
+
+def _holder_userid(echo_event: EchoEvent) -> Optional[int]:
+    poss = echo_event.possession
+    if poss is None or poss.team is None or poss.player is None:
+        return None
+    players = echo_event.teams[poss.team].players
+    if players is None or poss.player >= len(players):
+        return None
+    return players[poss.player].userid
+
+
+class ProximityConsumer(BaseTransitionConsumer):
+    transition_types = (PossessionChanged, StatIncrement)
+
+    def __init__(self, contest_radius: float = 3.0, pressure_radius: float = 3.0):
+        self.contest_radius = contest_radius
+        self.pressure_radius = pressure_radius
+        self._catches: list[CatchProximity] = []
+        self._shots: list[ShotPressure] = []
+        self._marking: dict[tuple[str, int], Counter[tuple[str, int]]] = {}
+        self._identities = IdentityRegistry()
+
+    def consume(self, event: ConsumerEvent) -> None:
+        self._identities = event.identities
+        super().consume(event)
+        if event.echo_event.game_status != GameStatus.PLAYING:
+            return
+        index = event.spatial_index
+        for point in index.points:
+            if point.kind != "head":
+                continue
+            nearest = index.nearest(
+                point.position, where=_is_opponent(point.team_name, "head")
+            )
+            if nearest:
+                opponent = nearest[0].point
+                self._marking.setdefault((point.team_name, point.userid), Counter())[
+                    (opponent.team_name, opponent.userid)
+                ] += 1
+
+    def consume_transition(
+        self, transition: PossessionChanged | StatIncrement, event: ConsumerEvent
+    ) -> None:
+        index = event.spatial_index
+        match transition:
+            case PossessionChanged(
+                current_team_name=str(team_name), current_player_name=str()
+            ) if event.echo_event.disc is not None:
+                userid = _holder_userid(event.echo_event)
+                if userid is None:
+                    return
+                head = _head(index, team_name, userid)
+                nearest = (
+                    []
+                    if head is None
+                    else index.nearest(head, where=_is_opponent(team_name, "head"))
+                )
+                self._catches.append(
+                    CatchProximity(
+                        datetime=transition.datetime,
+                        game_clock=transition.game_clock,
+                        team_name=team_name,
+                        userid=userid,
+                        nearest_opponent=_players(nearest)[0] if nearest else None,
+                        contesters=_players(
+                            index.within(
+                                event.echo_event.disc.position,
+                                self.contest_radius,
+                                where=_is_opponent(team_name),
+                            )
+                        ),
+                    )
+                )
+            case StatIncrement(increments={"shots_taken": _}):
+                head = _head(index, transition.team_name, transition.userid)
+                if head is None:
+                    return
+                self._shots.append(
+                    ShotPressure(
+                        datetime=transition.datetime,
+                        game_clock=transition.game_clock,
+                        team_name=transition.team_name,
+                        userid=transition.userid,
+                        defenders=_players(
+                            index.within(
+                                head,
+                                self.pressure_radius,
+                                where=_is_opponent(transition.team_name),
+                            )
+                        ),
+                    )
+                )
+
+    @property
+    def catches(self) -> list[CatchProximity]:
+        return self._catches
+
+    @property
+    def shots(self) -> list[ShotPressure]:
+        return self._shots
+
+    @property
+    def marking(self) -> dict[tuple[str, int], Counter[tuple[str, int]]]:
+        # frames each player spent with a given opponent as the closest one
+        return self._marking
+
+    def player_name(self, userid: int) -> str:
+        return self._identities.label(userid)
+
+    def marking_pairs(self) -> list[tuple[tuple[str, int], tuple[str, int], float]]:
+        pairs = []
+        for player, opponents in self._marking.items():
+            opponent, frames = opponents.most_common(1)[0]
+            pairs.append((player, opponent, frames / sum(opponents.values())))
+        return pairs
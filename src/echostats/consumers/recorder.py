@@ -1,23 +1,124 @@
+import json
+import math
 import os
+import sys
 import zipfile
+from array import array
 from contextlib import AbstractContextManager
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Iterable
+from typing import Iterator
+from typing import Optional
 
 from echostats._abc import BaseConsumer
 from echostats.models import ConsumerEvent
 
+CHUNKED_LAYOUT = b"echostats-chunked-v1"
+# member next to the frames holding (sent, received) per frame as little endian
+# doubles, written after them so tools reading the first member still find frames
+TIMINGS_SUFFIX = ".timings"
+
+
+def encode_timings(timings: array) -> bytes:
+    if sys.byteorder == "big":
+        timings = array("d", timings)
+        timings.byteswap()
+    return timings.tobytes()
+
+
+def decode_timings(data: bytes) -> array:
+    timings = array("d")
+    timings.frombytes(data)
+    if sys.byteorder == "big":
+        timings.byteswap()
+    return timings
+
+
+def write_timings(zfile: zipfile.ZipFile, name: str, timings: array) -> None:
+    # frames read back from files have no timings, nothing is written for them
+    if all(math.isnan(i) for i in timings):
+        return
+    zfile.writestr(
+        name + TIMINGS_SUFFIX,
+        encode_timings(timings),
+        compress_type=zipfile.ZIP_DEFLATED,
+    )
+
 
 class RecorderConsumer(BaseConsumer):
-    def __init__(self, path: str):
+    def __init__(self, path: str, chunk_frames: Optional[int] = None):
         self.path = path
+        # None keeps the single member layout other replay tools understand
+        self.chunk_frames = chunk_frames
         self.zfile = zipfile.ZipFile(self.path, mode="w")
-        self.fp = self.zfile.open(os.path.basename(self.path), mode="w")
+        self._timings = array("d")
+        if chunk_frames is None:
+            self.fp = self.zfile.open(os.path.basename(self.path), mode="w")
+        else:
+            self.zfile.comment = CHUNKED_LAYOUT
+            self.chunks = 0
+            self._lines: list[bytes] = []
+            self._first: Optional[datetime] = None
+            self._last: Optional[datetime] = None
+
+    @contextmanager
+    def _flush_on_exit(self) -> Iterator[None]:
+        try:
+            yield
+        finally:
+            self._write_chunk()
+
+    @contextmanager
+    def _write_timings_on_exit(self) -> Iterator[None]:
+        # a zip member can only be written once the frames member is closed
+        try:
+            yield
+        finally:
+            write_timings(self.zfile, os.path.basename(self.path), self._timings)
 
     def get_context_managers(self) -> Iterable[AbstractContextManager]:
-        return [self.zfile, self.fp]
+        if self.chunk_frames is None:
+            return [self.zfile, self._write_timings_on_exit(), self.fp]
+        return [self.zfile, self._flush_on_exit()]
+
+    def _write_chunk(self) -> None:
+        if not self._lines:
+            return
+        info = zipfile.ZipInfo(
+            f"{os.path.basename(self.path)}.{self.chunks:06d}",
+            date_time=self._first.timetuple()[:6],
+        )
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.comment = json.dumps(
+            {
+                "frames": len(self._lines),
+                "first": self._first.isoformat(sep=" ", timespec="milliseconds"),
+                "last": self._last.isoformat(sep=" ", timespec="milliseconds"),
+            }
+        ).encode()
+        self.zfile.writestr(info, b"".join(self._lines))
+        write_timings(self.zfile, info.filename, self._timings)
+        self.chunks += 1
+        self._lines = []
+        self._timings = array("d")
+        self._first = None
 
     def consume(self, event: ConsumerEvent) -> None:
-        dt = datetime.now().isoformat(sep=" ", timespec="milliseconds").encode()
+        # the frame's own time, so re-recording a merged or filtered stream keeps it
+        dtime = event.stream_event.datetime
+        dt = dtime.isoformat(sep=" ", timespec="milliseconds").encode()
         line = dt + b"\t" + event.stream_event.data + b"\n"
-        self.fp.write(line)
+        sent = event.stream_event.sent
+        received = event.stream_event.received
+        self._timings.append(math.nan if sent is None else sent)
+        self._timings.append(math.nan if received is None else received)
+        if self.chunk_frames is None:
+            self.fp.write(line)
+            return
+        if self._first is None:
+            self._first = dtime
+        self._last = dtime
+        self._lines.append(line)
+        if len(self._lines) >= self.chunk_frames:
+            self._write_chunk()
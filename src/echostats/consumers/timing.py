@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+import statistics
+from collections import deque
+from datetime import datetime
+from datetime import timedelta
+from typing import NamedTuple
+from typing import Optional
+
+from echostats._abc import BaseConsumer
+from echostats.models import ConsumerEvent
+from echostats.models import GameStatus
+
+
+class DurationHistogram:
+    # exact below 2**precision ms, then 2**(precision - 1) buckets per doubling,
+    # so stalls of seconds or minutes are kept to within a few percent
+    def __init__(self, precision: int = 6):
+        self.precision = precision
+        self.counts: list[int] = []
+
+    def _bucket(self, duration: int) -> int:
+        shift = max(duration.bit_length() - self.precision, 0)
+        return (shift << (self.precision - 1)) + (duration >> shift)
+
+    def _lower_bound(self, bucket: int) -> int:
+        shift = max((bucket >> (self.precision - 1)) - 1, 0)
+        return (bucket - (shift << (self.precision - 1))) << shift
+
+    def add(self, duration: int) -> None:
+        bucket = self._bucket(max(duration, 0))
+        if bucket >= len(self.counts):
+            self.counts.extend([0] * (bucket + 1 - len(self.counts)))
+        self.counts[bucket] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> Optional[int]:
+        total = self.total
+        if total == 0:
+            return None
+        cumulative = list(itertools.accumulate(self.counts))
+        return self._lower_bound(bisect.bisect_left(cumulative, q * total))
+
+
+class CaptureGap(NamedTuple):
+    # time of the first frame after the gap
+    datetime: datetime
+    seconds: float
+    expected: float
+
+
+class CaptureTimingSummary(NamedTuple):
+    frames: int
+    untimed: int
+    latency_p50: Optional[int]
+    latency_p95: Optional[int]
+    latency_p99: Optional[int]
+    interval_p50: Optional[int]
+    interval_p95: Optional[int]
+    jitter: float
+    gaps: int
+    lost: int
+    stale: int
+
+
+class CaptureTimingConsumer(BaseConsumer):
+    def __init__(self, gap_factor: float = 2.5, window: int = 16, max_gaps: int = 64):
+        # an interval longer than gap_factor times the recent median is a gap
+        self.gap_factor = gap_factor
+        self.frames = 0
+        self.untimed = 0
+        # milliseconds, request round trip and time between consecutive requests
+        self.latency = DurationHistogram()
+        self.interval = DurationHistogram()
+        # mean absolute difference between consecutive intervals, in milliseconds
+        self.jitter = 0.0
+        self.gap_count = 0
+        # polls the gaps would have held at the expected interval
+        self.lost = 0
+        self.gaps: deque[CaptureGap] = deque(maxlen=max_gaps)
+        # frames polled again before the game clock moved on
+        self.stale = 0
+        self._recent: deque[float] = deque(maxlen=window)
+        self._previous_sent: Optional[float] = None
+        self._previous_interval: Optional[float] = None
+        self._previous_clock: Optional[timedelta] = None
+        self._deltas = 0
+
+    def consume(self, event: ConsumerEvent) -> None:
+        self.frames += 1
+        echo_event = event.echo_event
+        game_clock = echo_event.game_clock
+        if (
+            echo_event.game_status == GameStatus.PLAYING
+            and game_clock is not None
+            and game_clock == self._previous_clock
+        ):
+            self.stale += 1
+        self._previous_clock = game_clock
+
+        stream_event = event.stream_event
+        sent, received = stream_event.sent, stream_event.received
+        if sent is None or received is None:
+            self.untimed += 1
+            return
+        self.latency.add(round((received - sent) * 1000))
+        if self._previous_sent is not None:
+            self._add_interval(stream_event.datetime, sent - self._previous_sent)
+        self._previous_sent = sent
+
+    def _add_interval(self, dtime: datetime, interval: float) -> None:
+        self.interval.add(round(interval * 1000))
+        if self._previous_interval is not None:
+            self._deltas += 1
+            delta = abs(interval - self._previous_interval) * 1000
+            self.jitter += (delta - self.jitter) / self._deltas
+        self._previous_interval = interval
+
+        if len(self._recent) == self._recent.maxlen:
+            expected = statistics.median(self._recent)
+            if interval > self.gap_factor * expected:
+                self.gap_count += 1
+                self.lost += max(round(interval / expected) - 1, 1)
+                self.gaps.append(CaptureGap(dtime, interval, expected))
+        # gaps stay in the window so a lasting rate change stops counting as one
+        self._recent.append(interval)
+
+    def summary(self) -> CaptureTimingSummary:
+        return CaptureTimingSummary(
+            frames=self.frames,
+            untimed=self.untimed,
+            latency_p50=self.latency.quantile(0.50),
+            latency_p95=self.latency.quantile(0.95),
+            latency_p99=self.latency.quantile(0.99),
+            interval_p50=self.interval.quantile(0.50),
+            interval_p95=self.interval.quantile(0.95),
+            jitter=self.jitter,
+            gaps=self.gap_count,
+            lost=self.lost,
+            stale=self.stale,
+        )
@@ -0,0 +1,110 @@
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from typing import Callable
+from typing import Generator
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+from typing import Type
+
+from echostats._abc import BaseConsumer
+from echostats._abc import ConsumerDependent
+from echostats._abc import ConsumerMapping
+from echostats.models import GameStatus
+from echostats.models import StreamEvent
+from echostats.streamer import BaseStreamer
+from echostats.streamer import MemoryStreamer
+
+MATCH_END_STATUSES = (GameStatus.POST_MATCH.value, GameStatus.POST_SUDDEN_DEATH.value)
+
+
+class MatchKey(NamedTuple):
+    sessionid: Optional[str]
+    # counts the matches (or reappearances when splitting per session) of a session
+    match_index: int
+
+
+class MatchResult(NamedTuple):
+    dependents: list[ConsumerDependent]
+    consumers: ConsumerMapping
+
+
+def _consume_substream(
+    events: list[StreamEvent], consumer_classes: list[Type[BaseConsumer]]
+) -> dict[Type[BaseConsumer], BaseConsumer]:
+    consumers = MemoryStreamer(events).consume(
+        consumer_class() for consumer_class in consumer_classes
+    )
+    return {type(consumer): consumer for consumer in consumers}
+
+
+class Demultiplexer:
+    def __init__(self, streamer: BaseStreamer, per_match: bool = True):
+        self.streamer = streamer
+        self.per_match = per_match
+
+    def split(self) -> Generator[tuple[MatchKey, list[StreamEvent]], None, None]:
+        indexes: dict[Optional[str], int] = {}
+        key: Optional[MatchKey] = None
+        events: list[StreamEvent] = []
+        previous_status: Optional[str] = None
+        for stream_event in self.streamer.read():
+            # only the routing fields are needed here, the full parse is done later
+            raw = json.loads(stream_event.data)
+            sessionid = raw.get("sessionid", key.sessionid if key else None)
+            status = raw.get("game_status") or None
+            new_match = (
+                self.per_match
+                and previous_status in MATCH_END_STATUSES
+                and status is not None
+                and status not in MATCH_END_STATUSES
+            )
+            if key is None or sessionid != key.sessionid or new_match:
+                if key is not None and events:
+                    yield key, events
+                index = indexes.get(sessionid, -1) + 1
+                indexes[sessionid] = index
+                key = MatchKey(sessionid, index)
+                events = []
+            events.append(stream_event)
+            if status is not None:
+                previous_status = status
+        if key is not None and events:
+            yield key, events
+
+    def resolve(
+        self,
+        dependents_factory: Callable[[], Iterable[ConsumerDependent]],
+        max_workers: Optional[int] = None,
+    ) -> dict[MatchKey, MatchResult]:
+        consumer_classes: list[Type[BaseConsumer]] = []
+        for dependent in dependents_factory():
+            for consumer_class in dependent.get_dependencies():
+                if consumer_class not in consumer_classes:
+                    consumer_classes.append(consumer_class)
+
+        max_workers = max_workers or os.cpu_count() or 1
+        futures: dict[MatchKey, Future] = {}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending: set[Future] = set()
+            for key, events in self.split():
+                # keep only a few substreams in flight so memory stays bounded
+                if len(pending) >= max_workers * 2:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                futures[key] = executor.submit(
+                    _consume_substream, events, consumer_classes
+                )
+                pending.add(futures[key])
+
+        results = {}
+        for key, future in futures.items():
+            consumers = ConsumerMapping(future.result())
+            dependents = list(dependents_factory())
+            for dependent in dependents:
+                dependent.init(consumers)
+            results[key] = MatchResult(dependents, consumers)
+        return results
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import sys
+from typing import Callable
+from typing import Generic
+from typing import Iterator
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import TypeVar
+
+if TYPE_CHECKING:
+    from echostats.models import EchoEvent
+    from echostats.models import Player
+
+V = TypeVar("V")
+
+
+class PlayerIdentity:
+    def __init__(self, id: int, userid: int):
+        self.id = id
+        self.userid = userid
+        # every name and team seen, in order, without consecutive repeats
+        self.names: list[str] = []
+        self.teams: list[str] = []
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.names[-1] if self.names else None
+
+    @property
+    def team(self) -> Optional[str]:
+        return self.teams[-1] if self.teams else None
+
+
+class IdentityRegistry:
+    def __init__(self):
+        self.players: list[PlayerIdentity] = []
+        self.teams: list[str] = []
+        self._player_ids: dict[int, int] = {}
+        self._team_ids: dict[str, int] = {}
+
+    def team_id(self, team_name: str) -> int:
+        team_id = self._team_ids.get(team_name)
+        if team_id is None:
+            team_id = self._team_ids[team_name] = len(self.teams)
+            self.teams.append(sys.intern(team_name))
+        return team_id
+
+    def player_id(self, player: Player, team_name: Optional[str] = None) -> int:
+        player_id = self._player_ids.get(player.userid)
+        if player_id is None:
+            player_id = self._player_ids[player.userid] = len(self.players)
+            self.players.append(PlayerIdentity(player_id, player.userid))
+        identity = self.players[player_id]
+        if identity.name != player.name:
+            identity.names.append(sys.intern(player.name))
+        if team_name is not None and identity.team != team_name:
+            identity.teams.append(self.teams[self.team_id(team_name)])
+        return player_id
+
+    def observe(self, echo_event: EchoEvent) -> None:
+        for team in echo_event.teams:
+            self.team_id(team.name)
+            for player in team.players or []:
+                self.player_id(player, team.name)
+
+    def name(self, player_id: int) -> Optional[str]:
+        return self.players[player_id].name
+
+    def by_userid(self, userid: int) -> Optional[PlayerIdentity]:
+        player_id = self._player_ids.get(userid)
+        return None if player_id is None else self.players[player_id]
+
+    def label(self, userid: int) -> str:
+        # the current name, with the userid when another player shares it
+        identity = self.by_userid(userid)
+        if identity is None:
+            return str(userid)
+        if sum(1 for i in self.players if i.name == identity.name) > 1:
+            return f"{identity.name} ({identity.userid})"
+        return identity.name
+
+
+class PlayerTable(Generic[V]):
+    # dense per team and per player storage, indexed by registry ids
+    def __init__(self, factory: Callable[[tuple[str, int]], V]):
+        self.factory = factory
+        self._rows: list[list[Optional[V]]] = []
+
+    def get(self, identities: IdentityRegistry, team_id: int, player_id: int) -> V:
+        while len(self._rows) <= team_id:
+            self._rows.append([])
+        row = self._rows[team_id]
+        if len(row) <= player_id:
+            row.extend([None] * (player_id + 1 - len(row)))
+        value = row[player_id]
+        if value is None:
+            # keyed on the userid, so renames and namesakes keep their own value
+            value = row[player_id] = self.factory(
+                (identities.teams[team_id], identities.players[player_id].userid)
+            )
+        return value
+
+    def items(self) -> Iterator[tuple[int, int, V]]:
+        for team_id, row in enumerate(self._rows):
+            for player_id, value in enumerate(row):
+                if value is not None:
+                    yield team_id, player_id, value
+
+    def named(self, identities: IdentityRegistry) -> dict[str, dict[str, V]]:
+        named: dict[str, dict[str, V]] = {}
+        for team_id, player_id, value in self.items():
+            team = named.setdefault(identities.teams[team_id], {})
+            team[identities.label(identities.players[player_id].userid)] = value
+        return named
+
+    def clear(self) -> None:
+        self._rows = []
@@ -0,0 +1,211 @@
+import multiprocessing
+import os
+import threading
+import uuid
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import MutableMapping
+from typing import NamedTuple
+from typing import Optional
+from typing import Type
+
+from echostats._abc import BaseConsumer
+from echostats._abc import BaseGrapher
+from echostats._abc import ConsumerDependent
+from echostats.arena import default_arena
+from echostats.consumers.disc import DiscPlayingGrapher
+from echostats.consumers.disc import GoalsGrapher
+from echostats.consumers.player import PingGrapher
+from echostats.consumers.player import PlayerDistanceNetworkGrapher
+from echostats.consumers.player import PlayerStatsGrapher
+from echostats.models import ConsumerEvent
+from echostats.render import render_figures
+from echostats.streamer import FileStreamer
+
+GRAPHERS: dict[str, Type[BaseGrapher]] = {
+    "goals": GoalsGrapher,
+    "disc": DiscPlayingGrapher,
+    "ping": PingGrapher,
+    "player_stats": PlayerStatsGrapher,
+    "player_distance_network": PlayerDistanceNetworkGrapher,
+}
+
+REPLAY_EXTENSIONS = (".echoreplay", ".echoarena")
+
+# timestamp, tab and newline around every frame of a recording
+LINE_OVERHEAD = 25
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    ...
+
+
+def replay_size(path: str) -> int:
+    if not zipfile.is_zipfile(path):
+        return os.path.getsize(path)
+    with zipfile.ZipFile(path) as echo_file_zip:
+        return sum(info.file_size for info in echo_file_zip.infolist())
+
+
+def list_replays(directory: str) -> list[str]:
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(REPLAY_EXTENSIONS)
+    )
+
+
+class ProgressConsumer(BaseConsumer):
+    def __init__(
+        self,
+        job_id: str,
+        total_size: int,
+        progress: MutableMapping[str, float],
+        cancelled: MutableMapping[str, bool],
+        every: int = 200,
+    ):
+        self.job_id = job_id
+        self.total_size = max(total_size, 1)
+        self.progress = progress
+        self.cancelled = cancelled
+        self.every = every
+        self.size = 0
+        self.frames = 0
+
+    def consume(self, event: ConsumerEvent) -> None:
+        # frames replayed from the arena have no raw data, nor need much progress
+        self.size += len(event.stream_event.data) + LINE_OVERHEAD
+        self.frames += 1
+        # the shared mappings are proxies, touching them on every frame is slow
+        if self.frames % self.every:
+            return
+        if self.cancelled.get(self.job_id):
+            raise JobCancelled(self.job_id)
+        self.progress[self.job_id] = min(self.size / self.total_size, 1.0)
+
+
+class AnalysisResult(NamedTuple):
+    # plotly JSON per grapher name
+    figures: dict[str, str]
+    timings: dict[str, float]
+
+
+def analyze_replay(
+    path: str,
+    job_id: str,
+    progress: MutableMapping[str, float],
+    cancelled: MutableMapping[str, bool],
+) -> AnalysisResult:
+    graphers = {name: grapher_class() for name, grapher_class in GRAPHERS.items()}
+    # each pool worker keeps the frames it decoded for the next job on that replay
+    FileStreamer(path, arena=default_arena).resolve(
+        [i for i in graphers.values() if isinstance(i, ConsumerDependent)],
+        [ProgressConsumer(job_id, replay_size(path), progress, cancelled)],
+    )
+    rendered = render_figures(graphers)
+    progress[job_id] = 1.0
+    return AnalysisResult(
+        figures={name: figure.to_json() for name, figure in rendered.figures.items()},
+        timings=rendered.timings,
+    )
+
+
+class JobKey(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+
+
+class Job:
+    def __init__(self, id: str, key: JobKey, future: Future, queue: "JobQueue"):
+        self.id = id
+        self.key = key
+        self.future = future
+        self._queue = queue
+
+    @property
+    def status(self) -> JobStatus:
+        if self.future.cancelled():
+            return JobStatus.CANCELLED
+        if not self.future.done():
+            return JobStatus.RUNNING if self.future.running() else JobStatus.PENDING
+        if isinstance(self.future.exception(), JobCancelled):
+            return JobStatus.CANCELLED
+        if self.future.exception() is not None:
+            return JobStatus.FAILED
+        return JobStatus.DONE
+
+    @property
+    def progress(self) -> float:
+        return self._queue.progress.get(self.id, 0.0)
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.status != JobStatus.FAILED:
+            return None
+        return repr(self.future.exception())
+
+    @property
+    def result(self) -> Optional[AnalysisResult]:
+        if self.status != JobStatus.DONE:
+            return None
+        return self.future.result()
+
+
+class JobQueue:
+    def __init__(self, max_workers: Optional[int] = None):
+        self._manager = multiprocessing.Manager()
+        self.progress: MutableMapping[str, float] = self._manager.dict()
+        self.cancelled: MutableMapping[str, bool] = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._jobs: dict[str, Job] = {}
+        self._by_key: dict[JobKey, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, path: str) -> Job:
+        stat = os.stat(path)
+        key = JobKey(os.path.abspath(path), stat.st_size, stat.st_mtime)
+        with self._lock:
+            # the same unchanged replay is analyzed once, failures can be retried
+            job = self._by_key.get(key)
+            if job is not None and job.status not in (
+                JobStatus.FAILED,
+                JobStatus.CANCELLED,
+            ):
+                return job
+            job_id = uuid.uuid4().hex
+            future = self._executor.submit(
+                analyze_replay, key.path, job_id, self.progress, self.cancelled
+            )
+            job = self._jobs[job_id] = self._by_key[key] = Job(
+                job_id, key, future, self
+            )
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.future.done():
+            return False
+        # pending jobs never start, running ones stop at their next progress check
+        if not job.future.cancel():
+            self.cancelled[job_id] = True
+        return True
+
+    def shutdown(self) -> None:
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+        self._manager.shutdown()
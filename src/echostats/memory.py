@@ -0,0 +1,98 @@
+import mmap
+import pickle
+import sys
+import tempfile
+from itertools import islice
+from types import FunctionType
+from types import ModuleType
+from typing import Any
+from typing import Mapping
+from typing import Optional
+
+SIZEOF_SAMPLE = 64
+SIZE_UNITS = ("B", "KB", "MB", "GB")
+
+
+def deep_sizeof(obj: Any, sample: int = SIZEOF_SAMPLE) -> int:
+    # large containers are estimated from their first `sample` items
+    seen: set[int] = set()
+
+    def sizeof(item: Any) -> int:
+        if id(item) in seen or isinstance(item, (type, ModuleType, FunctionType)):
+            return 0
+        seen.add(id(item))
+        size = sys.getsizeof(item)
+        if isinstance(item, dict):
+            children = list(islice(item.items(), sample))
+            child_size = sum(sizeof(key) + sizeof(value) for key, value in children)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            children = list(islice(item, sample))
+            child_size = sum(sizeof(value) for value in children)
+        else:
+            children = []
+            child_size = 0
+            if hasattr(item, "__dict__"):
+                size += sizeof(vars(item))
+            return size
+        if children:
+            size += child_size * len(item) // len(children)
+        return size
+
+    return sizeof(obj)
+
+
+def format_size(size: float) -> str:
+    unit = 0
+    while size >= 1024 and unit < len(SIZE_UNITS) - 1:
+        size /= 1024
+        unit += 1
+    return f"{size:.1f} {SIZE_UNITS[unit]}"
+
+
+def format_memory_usage(usage: Mapping[str, int]) -> str:
+    # largest first, that is the one to put a budget on
+    return ", ".join(
+        f"{name} {format_size(size)}"
+        for name, size in sorted(usage.items(), key=lambda i: i[1], reverse=True)
+    )
+
+
+class SpillFile:
+    # append-only file of pickled values, read back through a memory map
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._mapped: Optional[mmap.mmap] = None
+        self.size = 0
+        # bytes of discarded values, reclaimed by copying the live ones elsewhere
+        self.dead = 0
+
+    def append_raw(self, data: bytes) -> tuple[int, int]:
+        offset = self.size
+        self._file.seek(offset)
+        self._file.write(data)
+        self.size += len(data)
+        return offset, len(data)
+
+    def append(self, value: Any) -> tuple[int, int]:
+        return self.append_raw(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def read_raw(self, offset: int, length: int) -> bytes:
+        if self._mapped is None or offset + length > len(self._mapped):
+            self._file.flush()
+            if self._mapped is not None:
+                self._mapped.close()
+            self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mapped[offset : offset + length]
+
+    def read(self, offset: int, length: int) -> Any:
+        return pickle.loads(self.read_raw(offset, length))
+
+    def discard(self, length: int) -> None:
+        self.dead += length
+
+    def close(self) -> None:
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+        self._file.close()
@@ -0,0 +1,150 @@
+import heapq
+import itertools
+import json
+import statistics
+from collections import deque
+from datetime import datetime
+from datetime import timedelta
+from typing import Generator
+from typing import NamedTuple
+from typing import Optional
+
+from echostats.models import GameStatus
+from echostats.models import PausedState
+from echostats.models import StreamEvent
+from echostats.streamer import BaseStreamer
+
+RUNNING_STATUSES = (GameStatus.PLAYING.value, GameStatus.SUDDEN_DEATH.value)
+
+
+class FrameKey(NamedTuple):
+    sessionid: Optional[str]
+    game_status: Optional[str]
+    game_clock: Optional[float]
+
+
+class RoutedFrame(NamedTuple):
+    # corrected datetime first so frames from every source sort on one timeline
+    datetime: datetime
+    source: int
+    key: FrameKey
+    running: bool
+    stream_event: StreamEvent
+
+
+def _route(source: int, stream_event: StreamEvent, offset: timedelta) -> RoutedFrame:
+    # only the alignment fields are needed here, the full parse is done later
+    raw = json.loads(stream_event.data)
+    pause = raw.get("pause") or {}
+    key = FrameKey(raw.get("sessionid"), raw.get("game_status"), raw.get("game_clock"))
+    running = key.game_status in RUNNING_STATUSES and pause.get("paused_state") in (
+        None,
+        PausedState.UN_PAUSED.value,
+    )
+    return RoutedFrame(
+        stream_event.datetime + offset, source, key, running, stream_event
+    )
+
+
+class MergedStreamer(BaseStreamer):
+    def __init__(
+        self,
+        streamers: list[BaseStreamer],
+        sync_sample: int = 16,
+        tolerance: timedelta = timedelta(milliseconds=50),
+        window: timedelta = timedelta(seconds=5),
+    ):
+        # every source is read twice, once to align the clocks and once to merge
+        self.streamers = streamers
+        # one in sync_sample running frames, picked by key so every source keeps
+        # the same ones, is indexed to estimate the clock offsets
+        self.sync_sample = sync_sample
+        # while the game clock runs a clock value is one server tick, while it
+        # is frozen frames of other sources within tolerance are duplicates
+        self.tolerance = tolerance
+        self.window = window
+        self.offsets: list[timedelta] = []
+        # sources sharing no running frame with source 0, directly or through others
+        self.unaligned: list[int] = []
+        self.frames_per_source: list[int] = []
+        self.duplicates = 0
+
+    def _index_source(self, source: int) -> dict[FrameKey, datetime]:
+        index: dict[FrameKey, datetime] = {}
+        for stream_event in self.streamers[source].read():
+            frame = _route(source, stream_event, timedelta())
+            if frame.running and hash(frame.key) % self.sync_sample == 0:
+                index.setdefault(frame.key, frame.datetime)
+        return index
+
+    def _estimate_offsets(self, indexes: list[dict[FrameKey, datetime]]) -> None:
+        # pairwise offsets over the frames two sources share, chained outwards
+        # from source 0 through the pairs with the most shared frames
+        pairs: list[tuple[int, int, int, float]] = []
+        for a, b in itertools.combinations(range(len(indexes)), 2):
+            deltas = [
+                (dtime - indexes[b][key]).total_seconds()
+                for key, dtime in indexes[a].items()
+                if key in indexes[b]
+            ]
+            if deltas:
+                pairs.append((len(deltas), a, b, statistics.median(deltas)))
+        offsets: dict[int, float] = {0: 0.0} if indexes else {}
+        changed = True
+        while changed:
+            changed = False
+            for _, a, b, delta in sorted(pairs, reverse=True):
+                if a in offsets and b not in offsets:
+                    offsets[b] = offsets[a] + delta
+                elif b in offsets and a not in offsets:
+                    offsets[a] = offsets[b] - delta
+                else:
+                    continue
+                changed = True
+                break
+        self.offsets = [
+            timedelta(seconds=offsets.get(source, 0.0))
+            for source in range(len(indexes))
+        ]
+        self.unaligned = [i for i in range(len(indexes)) if i not in offsets]
+
+    def _source(self, source: int) -> Generator[RoutedFrame, None, None]:
+        offset = self.offsets[source]
+        for stream_event in self.streamers[source].read():
+            yield _route(source, stream_event, offset)
+
+    def read(self) -> Generator[StreamEvent, None, None]:
+        self._estimate_offsets(
+            [self._index_source(source) for source in range(len(self.streamers))]
+        )
+        self.frames_per_source = [0] * len(self.streamers)
+        self.duplicates = 0
+
+        seen: dict[FrameKey, tuple[datetime, int]] = {}
+        recent: deque[tuple[datetime, FrameKey]] = deque()
+        sources = [self._source(source) for source in range(len(self.streamers))]
+        for frame in heapq.merge(*sources, key=lambda i: (i.datetime, i.source)):
+            while recent and frame.datetime - recent[0][0] > self.window:
+                _, old_key = recent.popleft()
+                if old_key in seen and seen[old_key][0] <= frame.datetime - self.window:
+                    del seen[old_key]
+            last_seen = seen.get(frame.key)
+            if last_seen is not None and (
+                frame.running
+                or (
+                    last_seen[1] != frame.source
+                    and frame.datetime - last_seen[0] <= self.tolerance
+                )
+            ):
+                self.duplicates += 1
+                continue
+            seen[frame.key] = (frame.datetime, frame.source)
+            recent.append((frame.datetime, frame.key))
+            self.frames_per_source[frame.source] += 1
+            # sent and received stay on the monotonic clock of their own capture
+            yield StreamEvent.construct(
+                data=frame.stream_event.data,
+                datetime=frame.datetime,
+                sent=frame.stream_event.sent,
+                received=frame.stream_event.received,
+            )
@@ -8,13 +8,19 @@ from enum import Enum
 from typing import Any
 from typing import Literal
 from typing import Optional
+from typing import TYPE_CHECKING
 
+from echostats.identity import IdentityRegistry
 from pydantic import BaseModel
 from pydantic import Field
+from pydantic import PrivateAttr
 from pydantic import StrictBytes
 from pydantic import StrictStr
 from pydantic import validator
 
+if TYPE_CHECKING:
+    from echostats.spatial import SpatialIndex
+
 
 class MapName(Enum):
     MPL_ARENA_A = "mpl_arena_a"
@@ -289,13 +295,76 @@ class EchoEvent(BaseModel):
 
 class StreamEvent(BaseModel):
     data: StrictStr | StrictBytes
-    datetime: datetime_class = Field(
-        default_factory=lambda: datetime_class.now().isoformat(
-            sep=" ", timespec="milliseconds"
-        )
-    )
+    datetime: datetime_class = Field(default_factory=datetime_class.now)
+    # time.monotonic() around the request, only known for frames polled live
+    sent: Optional[float] = None
+    received: Optional[float] = None
+
+
+class Transition(BaseModel):
+    datetime: datetime_class
+    game_clock: Optional[timedelta]
+
+
+class GameStatusChanged(Transition):
+    previous: Optional[GameStatus]
+    current: Optional[GameStatus]
+
+
+class PauseChanged(Transition):
+    previous: Optional[PausedState]
+    current: Optional[PausedState]
+
+
+class PossessionChanged(Transition):
+    previous_team_name: Optional[str]
+    previous_player_name: Optional[str]
+    current_team_name: Optional[str]
+    current_player_name: Optional[str]
+
+
+class GoalScored(Transition):
+    last_score: LastScore
+    disc_position: Optional[Vector3D]
+
+
+class PlayerJoined(Transition):
+    team_name: str
+    player_name: str
+    userid: int
+    stats: Stats
+
+
+class PlayerLeft(Transition):
+    team_name: str
+    player_name: str
+    userid: int
+
+
+class StatIncrement(Transition):
+    team_name: str
+    player_name: str
+    userid: int
+    stats: Stats
+    increments: dict[str, int]
 
 
 class ConsumerEvent(BaseModel):
     stream_event: StreamEvent
     echo_event: EchoEvent
+    transitions: list[Transition] = []
+    identities: IdentityRegistry = Field(default_factory=IdentityRegistry)
+    _spatial_index: Optional[SpatialIndex] = PrivateAttr(default=None)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def spatial_index(self) -> SpatialIndex:
+        # built on first use and shared by every consumer of the frame
+        if self._spatial_index is None:
+            # numpy stays out of the recording path until an index is needed
+            from echostats.spatial import SpatialIndex
+
+            self._spatial_index = SpatialIndex.from_echo_event(self.echo_event)
+        return self._spatial_index
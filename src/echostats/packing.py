@@ -0,0 +1,113 @@
+import uuid
+from datetime import datetime
+from datetime import timedelta
+from enum import Enum
+from ipaddress import IPv4Address
+from operator import itemgetter
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import Type
+
+from echostats.models import EchoEvent
+from pydantic import BaseModel
+from pydantic.fields import ModelField
+from pydantic.fields import SHAPE_LIST
+from pydantic.fields import SHAPE_SINGLETON
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+Codec = tuple[Callable[[Any], Any], Callable[[Any], Any]]
+
+
+def _type_codec(type_: Any) -> Optional[Codec]:
+    if isinstance(type_, type):
+        if issubclass(type_, BaseModel):
+            return _model_codec(type_)
+        if issubclass(type_, Enum):
+            return lambda value: value.value, type_
+        if issubclass(type_, timedelta):
+            return lambda value: value // MICROSECOND, lambda value: value * MICROSECOND
+        if issubclass(type_, uuid.UUID):
+            return lambda value: value.bytes, lambda value: uuid.UUID(bytes=value)
+        if issubclass(type_, IPv4Address):
+            return int, IPv4Address
+    # str, int, float, bool, Literal and Any hold JSON values marshal takes as is
+    return None
+
+
+def _field_codec(field: ModelField) -> Optional[Codec]:
+    codec = _type_codec(field.type_)
+    if field.shape == SHAPE_SINGLETON or codec is None and field.shape == SHAPE_LIST:
+        return codec
+    if field.shape != SHAPE_LIST:
+        raise TypeError(f"cannot pack {field.name}: {field.outer_type_}")
+    pack, unpack = codec
+    return lambda value: list(map(pack, value)), lambda value: list(map(unpack, value))
+
+
+_model_codecs: dict[Type[BaseModel], Codec] = {}
+
+
+def _model_codec(model_class: Type[BaseModel]) -> Codec:
+    codec = _model_codecs.get(model_class)
+    if codec is not None:
+        return codec
+    names = tuple(model_class.__fields__)
+    get_values: Callable[[dict], tuple]
+    if len(names) > 1:
+        get_values = itemgetter(*names)
+    else:
+        # itemgetter of a single name returns the bare value
+        get_values = lambda i: (i[names[0]],)
+    set_attribute = object.__setattr__
+    # only the fields that aren't plain values go through a codec, None stays None
+    converted: list[tuple[int, str, Callable, Callable]] = []
+
+    def pack(model: BaseModel) -> tuple:
+        values = get_values(model.__dict__)
+        if not converted:
+            return values
+        packed = list(values)
+        for i, _, field_pack, _ in converted:
+            if packed[i] is not None:
+                packed[i] = field_pack(packed[i])
+        return tuple(packed)
+
+    def unpack(values: tuple) -> BaseModel:
+        # the values were validated when the frame was parsed, only rebuild
+        fields = dict(zip(names, values))
+        for _, name, _, field_unpack in converted:
+            value = fields[name]
+            if value is not None:
+                fields[name] = field_unpack(value)
+        model = object.__new__(model_class)
+        set_attribute(model, "__dict__", fields)
+        set_attribute(model, "__fields_set__", set(names))
+        return model
+
+    # registered before the fields so recursive models find it
+    codec = _model_codecs[model_class] = (pack, unpack)
+    for i, field in enumerate(model_class.__fields__.values()):
+        field_codec = _field_codec(field)
+        if field_codec is not None:
+            converted.append((i, field.name, *field_codec))
+    return codec
+
+
+def pack_values(echo_event: EchoEvent) -> tuple:
+    # nested tuples of plain values, in field order
+    return _model_codec(EchoEvent)[0](echo_event)
+
+
+def unpack_values(values: tuple) -> EchoEvent:
+    return _model_codec(EchoEvent)[1](values)
+
+
+def pack_datetime(dtime: datetime) -> int:
+    return (dtime - EPOCH) // MICROSECOND
+
+
+def unpack_datetime(micros: int) -> datetime:
+    return EPOCH + micros * MICROSECOND
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import importlib
+import time
+from typing import Mapping
+from typing import NamedTuple
+from typing import Optional
+from typing import TYPE_CHECKING
+
+from echostats._abc import BaseGrapher
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+
+class RenderResult(NamedTuple):
+    figures: dict[str, go.Figure]
+    # seconds of each grapher's generate_figure
+    timings: dict[str, float]
+
+    @property
+    def slowest(self) -> Optional[str]:
+        return max(self.timings, key=self.timings.__getitem__, default=None)
+
+
+# imported up front, so the first grapher isn't charged for them
+PLOTTING_MODULES = ("pandas", "plotly.express", "plotly.graph_objects")
+
+
+def render_figures(graphers: Mapping[str, BaseGrapher]) -> RenderResult:
+    # one after the other, building a figure holds the GIL so threads don't overlap
+    # and a process pool spends more pickling the consumers than it saves
+    for module in PLOTTING_MODULES:
+        importlib.import_module(module)
+    figures = {}
+    timings = {}
+    for name, grapher in graphers.items():
+        start = time.perf_counter()
+        figures[name] = grapher.generate_figure()
+        timings[name] = time.perf_counter() - start
+    return RenderResult(figures=figures, timings=timings)
@@ -0,0 +1,166 @@
+import bisect
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Optional
+from typing import Type
+
+from echostats.streamer import BaseStreamer
+
+
+class ReplayPlayback:
+    def __init__(
+        self,
+        offsets: list[float],
+        frames: list[bytes],
+        speed: float = 1.0,
+        loop: bool = True,
+    ):
+        self.offsets = offsets
+        self.frames = frames
+        # speed <= 0 means max speed: every request gets the next frame
+        self.speed = speed
+        self.loop = loop
+        self._index = 0
+        self._start: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        return self.offsets[-1] if self.offsets else 0.0
+
+    def next_frame(self) -> Optional[bytes]:
+        with self._lock:
+            if not self.frames:
+                return None
+            if self.speed <= 0:
+                if self._index >= len(self.frames):
+                    if not self.loop:
+                        return None
+                    self._index = 0
+                frame = self.frames[self._index]
+                self._index += 1
+                return frame
+
+            now = time.monotonic()
+            if self._start is None:
+                self._start = now
+            elapsed = (now - self._start) * self.speed
+            if elapsed > self.duration:
+                if not self.loop:
+                    return None
+                elapsed %= self.duration or 1.0
+            index = bisect.bisect_right(self.offsets, elapsed) - 1
+            return self.frames[max(index, 0)]
+
+
+class ReplayServerStats:
+    def __init__(self):
+        self.served = 0
+        self.gaps = 0
+        self.finished = 0
+        self._lock = threading.Lock()
+
+    def count(self, attribute: str) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+
+class ReplayServer:
+    def __init__(
+        self,
+        streamer: BaseStreamer,
+        host: str = "127.0.0.1",
+        speed: float = 1.0,
+        gap_rate: float = 0.0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        loop: bool = True,
+    ):
+        self.host = host
+        self.speed = speed
+        self.gap_rate = gap_rate
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.loop = loop
+        self.offsets: list[float] = []
+        self.frames: list[bytes] = []
+        first_time = None
+        for stream_event in streamer.read():
+            if first_time is None:
+                first_time = stream_event.datetime
+            self.offsets.append((stream_event.datetime - first_time).total_seconds())
+            data = stream_event.data
+            self.frames.append(data if isinstance(data, bytes) else data.encode())
+        self.servers: dict[int, ThreadingHTTPServer] = {}
+        self.stats: dict[int, ReplayServerStats] = {}
+        self._threads: list[threading.Thread] = []
+
+    def _make_handler(
+        self, playback: ReplayPlayback, stats: ReplayServerStats
+    ) -> Type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                delay = server.latency + random.uniform(0, server.latency_jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                if self.path != "/session":
+                    self.send_error(404)
+                    return
+                if random.random() < server.gap_rate:
+                    stats.count("gaps")
+                    self.send_error(404)
+                    return
+                frame = playback.next_frame()
+                if frame is None:
+                    stats.count("finished")
+                    self.send_error(404)
+                    return
+                stats.count("served")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(frame)))
+                self.end_headers()
+                self.wfile.write(frame)
+
+            def log_message(self, format: str, *args) -> None:
+                ...
+
+        return Handler
+
+    def start(self, ports: list[int]) -> None:
+        for port in ports:
+            playback = ReplayPlayback(
+                self.offsets, self.frames, speed=self.speed, loop=self.loop
+            )
+            stats = self.stats[port] = ReplayServerStats()
+            http_server = ThreadingHTTPServer(
+                (self.host, port), self._make_handler(playback, stats)
+            )
+            http_server.daemon_threads = True
+            self.servers[port] = http_server
+            thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        for http_server in self.servers.values():
+            http_server.shutdown()
+            http_server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def serve_forever(self, ports: list[int]) -> None:
+        self.start(ports)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
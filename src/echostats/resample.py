@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from datetime import datetime
+from datetime import timedelta
+from typing import Hashable
+from typing import Iterable
+from typing import Mapping
+from typing import NamedTuple
+
+import numpy as np
+from echostats.models import Vector3D
+
+
+class Timeline(NamedTuple):
+    start: datetime
+    rate: float
+    # seconds since start, one entry per sample
+    seconds: np.ndarray
+
+    @classmethod
+    def covering(
+        cls, series: Iterable[Mapping[datetime, Vector3D]], rate: float
+    ) -> Timeline:
+        first = None
+        last = None
+        for samples in series:
+            if not samples:
+                continue
+            times = samples.keys()
+            first = min(times) if first is None else min(first, min(times))
+            last = max(times) if last is None else max(last, max(times))
+        if first is None or last is None:
+            return cls(datetime.min, rate, np.empty(0))
+        length = int((last - first).total_seconds() * rate) + 1
+        return cls(first, rate, np.arange(length) / rate)
+
+    @property
+    def datetimes(self) -> list[datetime]:
+        return [self.start + timedelta(seconds=float(i)) for i in self.seconds]
+
+
+class ResampledSeries(NamedTuple):
+    # (n, 3) positions and (n,) validity, invalid rows are inside gaps or out of range
+    positions: np.ndarray
+    mask: np.ndarray
+
+    def speeds(self, rate: float) -> np.ndarray:
+        speeds = np.full(len(self.mask), np.nan)
+        if len(self.mask) < 2:
+            return speeds
+        steps = np.linalg.norm(np.diff(self.positions, axis=0), axis=1) * rate
+        valid = self.mask[1:] & self.mask[:-1]
+        speeds[1:][valid] = steps[valid]
+        return speeds
+
+
+def resample(
+    samples: Mapping[datetime, Vector3D], timeline: Timeline, max_gap: float = 0.5
+) -> ResampledSeries:
+    count = len(timeline.seconds)
+    if not samples or count == 0:
+        return ResampledSeries(np.full((count, 3), np.nan), np.zeros(count, bool))
+
+    items = sorted(samples.items())
+    seconds = np.fromiter(
+        ((dtime - timeline.start).total_seconds() for dtime, _ in items),
+        dtype=float,
+        count=len(items),
+    )
+    xyz = np.array([(i.x, i.y, i.z) for _, i in items], dtype=float)
+    positions = np.column_stack(
+        [np.interp(timeline.seconds, seconds, xyz[:, axis]) for axis in range(3)]
+    )
+
+    # a point is valid when the samples around it are at most max_gap apart
+    after = np.searchsorted(seconds, timeline.seconds)
+    before = np.clip(after - 1, 0, len(seconds) - 1)
+    after = np.clip(after, 0, len(seconds) - 1)
+    exact = seconds[after] == timeline.seconds
+    mask = (
+        (timeline.seconds >= seconds[0])
+        & (timeline.seconds <= seconds[-1])
+        & (exact | (seconds[after] - seconds[before] <= max_gap))
+    )
+    positions[~mask] = np.nan
+    return ResampledSeries(positions, mask)
+
+
+def resample_all(
+    series: Mapping[Hashable, Mapping[datetime, Vector3D]],
+    rate: float = 10,
+    max_gap: float = 0.5,
+) -> tuple[Timeline, dict[Hashable, ResampledSeries]]:
+    timeline = Timeline.covering(series.values(), rate)
+    return timeline, {
+        key: resample(samples, timeline, max_gap=max_gap)
+        for key, samples in series.items()
+    }
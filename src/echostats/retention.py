@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from typing import Callable
+from typing import Generic
+from typing import Hashable
+from typing import Iterator
+from typing import MutableMapping
+from typing import Optional
+from typing import TypeVar
+from uuid import UUID
+
+from echostats.memory import deep_sizeof
+from echostats.memory import SpillFile
+from echostats.models import ConsumerEvent
+
+V = TypeVar("V")
+
+
+class Rollup(ABC):
+    @abstractmethod
+    def add(self, key: datetime, value: Any) -> None:
+        ...
+
+
+class SummaryRollup(Rollup):
+    def __init__(self, value_getter: Optional[Callable[[Any], float]] = None):
+        self.value_getter = value_getter
+        self.count = 0
+        self.first: Optional[datetime] = None
+        self.last: Optional[datetime] = None
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def add(self, key: datetime, value: Any) -> None:
+        self.count += 1
+        if self.first is None or key < self.first:
+            self.first = key
+        if self.last is None or key > self.last:
+            self.last = key
+        if self.value_getter is None:
+            return
+        number = self.value_getter(value)
+        self.total += number
+        if self.minimum is None or number < self.minimum:
+            self.minimum = number
+        if self.maximum is None or number > self.maximum:
+            self.maximum = number
+
+    @property
+    def mean(self) -> Optional[float]:
+        if self.value_getter is None or self.count == 0:
+            return None
+        return self.total / self.count
+
+
+class RetainedSeries(MutableMapping[datetime, V], Generic[V]):
+    def __init__(
+        self,
+        policy: Optional[RetentionPolicy] = None,
+        rollup: Optional[Rollup] = None,
+    ):
+        self.policy = policy
+        self.rollup = rollup
+        # OrderedDict pops the oldest entry in O(1), a plain dict is leaner
+        self._data: dict[datetime, Any] = self._new_data()
+        # once spilled, _data maps keys to (offset, length) in the spill file
+        self._spill: Optional[SpillFile] = None
+
+    def _new_data(self) -> dict[datetime, Any]:
+        if self.policy is not None:
+            return OrderedDict()
+        return {}
+
+    def __getitem__(self, key: datetime) -> V:
+        if self._spill is not None:
+            return self._spill.read(*self._data[key])
+        return self._data[key]
+
+    def __setitem__(self, key: datetime, value: V) -> None:
+        if self._spill is not None:
+            if key in self._data:
+                self._spill.discard(self._data[key][1])
+            self._data[key] = self._spill.append(value)
+        else:
+            self._data[key] = value
+        if self.policy is not None:
+            self.policy.trim(self)
+
+    def __delitem__(self, key: datetime) -> None:
+        if self._spill is not None:
+            self._spill.discard(self._data[key][1])
+        del self._data[key]
+
+    def __iter__(self) -> Iterator[datetime]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def oldest(self) -> datetime:
+        return next(iter(self._data))
+
+    def evict_oldest(self) -> None:
+        key = self.oldest()
+        if self.rollup is not None:
+            self.rollup.add(key, self[key])
+        del self[key]
+
+    def evict_all(self) -> None:
+        while self._data:
+            self.evict_oldest()
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill is not None
+
+    def spill(self, spill_file: SpillFile) -> None:
+        for key, value in self._data.items():
+            self._data[key] = spill_file.append(value)
+        self._spill = spill_file
+
+    def move_spill(self, spill_file: SpillFile) -> None:
+        # copies the pickled bytes as they are, nothing is unpickled
+        for key, (offset, length) in self._data.items():
+            self._data[key] = spill_file.append_raw(
+                self._spill.read_raw(offset, length)
+            )
+        self._spill = spill_file
+
+    def memory_usage(self) -> int:
+        return deep_sizeof(self._data)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # spill files stay local, a pickled series carries its values
+        state = self.__dict__.copy()
+        if self._spill is not None:
+            data = self._new_data()
+            data.update(self.items())
+            state["_data"] = data
+            state["_spill"] = None
+        return state
+
+
+class RetentionPolicy(ABC):
+    def observe(self, event: ConsumerEvent) -> bool:
+        # True means everything retained so far has to be evicted
+        return False
+
+    @abstractmethod
+    def trim(self, series: RetainedSeries) -> None:
+        ...
+
+
+class TimeWindowRetention(RetentionPolicy):
+    def __init__(self, window: timedelta):
+        self.window = window
+        self.latest: Optional[datetime] = None
+
+    def observe(self, event: ConsumerEvent) -> bool:
+        self.latest = event.stream_event.datetime
+        return False
+
+    def trim(self, series: RetainedSeries) -> None:
+        if self.latest is None:
+            return
+        limit = self.latest - self.window
+        while series and series.oldest() < limit:
+            series.evict_oldest()
+
+
+class FrameCountRetention(RetentionPolicy):
+    def __init__(self, frames: int):
+        self.frames = frames
+
+    def trim(self, series: RetainedSeries) -> None:
+        while len(series) > self.frames:
+            series.evict_oldest()
+
+
+class MatchRetention(RetentionPolicy):
+    def __init__(self):
+        self.sessionid: Optional[UUID] = None
+
+    def observe(self, event: ConsumerEvent) -> bool:
+        sessionid = event.echo_event.sessionid
+        if sessionid is None or sessionid == self.sessionid:
+            return False
+        is_new_match = self.sessionid is not None
+        self.sessionid = sessionid
+        return is_new_match
+
+    def trim(self, series: RetainedSeries) -> None:
+        ...
+
+
+class Retention:
+    def __init__(
+        self,
+        policy: Optional[RetentionPolicy] = None,
+        rollup: Optional[Callable[[], Rollup]] = None,
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        check_every: int = 256,
+        compact_ratio: float = 0.5,
+    ):
+        self.policy = policy
+        self.rollup_factory = rollup
+        # bytes kept in memory before the largest series spill to disk
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.check_every = check_every
+        # the spill file is rewritten once this share of it holds evicted values
+        self.compact_ratio = compact_ratio
+        self.rollups: dict[Hashable, Rollup] = {}
+        self._series: dict[Hashable, RetainedSeries] = {}
+        self._spill_file: Optional[SpillFile] = None
+        self._frames = 0
+
+    def series(self, key: Hashable) -> RetainedSeries:
+        series = self._series.get(key)
+        if series is None:
+            rollup = None
+            if self.rollup_factory is not None:
+                rollup = self.rollups.get(key)
+                if rollup is None:
+                    rollup = self.rollups[key] = self.rollup_factory()
+            series = self._series[key] = RetainedSeries(self.policy, rollup)
+            if self._spill_file is not None:
+                series.spill(self._spill_file)
+        return series
+
+    def memory_usage(self) -> int:
+        return sum(series.memory_usage() for series in self._series.values())
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_spill_file"] = None
+        return state
+
+    def enforce_budget(self) -> None:
+        if self.memory_budget is None:
+            return
+        usage = {
+            key: series.memory_usage()
+            for key, series in self._series.items()
+            if not series.spilled
+        }
+        total = self.memory_usage()
+        for key in sorted(usage, key=usage.__getitem__, reverse=True):
+            if total <= self.memory_budget:
+                break
+            if self._spill_file is None:
+                self._spill_file = SpillFile(self.spill_dir)
+            series = self._series[key]
+            series.spill(self._spill_file)
+            total -= usage[key] - series.memory_usage()
+
+    def compact_spill(self) -> None:
+        spill_file = self._spill_file
+        if (
+            spill_file is None
+            or spill_file.dead <= self.compact_ratio * spill_file.size
+        ):
+            return
+        compacted = SpillFile(spill_file.directory)
+        for series in self._series.values():
+            if series.spilled:
+                series.move_spill(compacted)
+        spill_file.close()
+        self._spill_file = compacted
+
+    def observe(self, event: ConsumerEvent) -> bool:
+        self._frames += 1
+        if self.memory_budget is not None and self._frames % self.check_every == 0:
+            self.enforce_budget()
+        if self.policy is None:
+            return False
+        if self.policy.observe(event):
+            for series in self._series.values():
+                series.evict_all()
+            self._series = {}
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            return True
+        for series in self._series.values():
+            self.policy.trim(series)
+        self.compact_spill()
+        return False
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import Callable
+from typing import NamedTuple
+from typing import Optional
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from echostats.models import EchoEvent
+    from echostats.models import Vector3D
+
+SPECTATORS = "SPECTATORS"
+
+
+class SpatialPoint(NamedTuple):
+    # "head", "lhand", "rhand" or "disc", the disc has no team nor player
+    kind: str
+    team_name: Optional[str]
+    # names are resolved through the identities only for display
+    userid: Optional[int]
+    position: tuple[float, float, float]
+
+
+class Neighbour(NamedTuple):
+    point: SpatialPoint
+    distance: float
+
+
+class SpatialIndex:
+    # uniform grid over the arena, a frame has a few dozen points at most
+    def __init__(self, points: list[SpatialPoint], cell_size: float = 4.0):
+        self.points = points
+        self.cell_size = cell_size
+        self.positions = np.array([i.position for i in points], dtype=float).reshape(
+            -1, 3
+        )
+        self._cells: dict[tuple[int, int, int], list[int]] = {}
+        for i, (x, y, z) in enumerate(self._cell_of(self.positions).tolist()):
+            self._cells.setdefault((x, y, z), []).append(i)
+
+    @classmethod
+    def from_echo_event(
+        cls, echo_event: EchoEvent, cell_size: float = 4.0
+    ) -> SpatialIndex:
+        points = []
+        for team in echo_event.teams:
+            if team.name == SPECTATORS:
+                continue
+            for player in team.players or []:
+                for kind in ("head", "lhand", "rhand"):
+                    pflu = getattr(player, kind)
+                    if pflu is None:
+                        continue
+                    position = pflu.position
+                    points.append(
+                        SpatialPoint(
+                            kind,
+                            team.name,
+                            player.userid,
+                            (position.x, position.y, position.z),
+                        )
+                    )
+        if echo_event.disc is not None:
+            position = echo_event.disc.position
+            points.append(
+                SpatialPoint("disc", None, None, (position.x, position.y, position.z))
+            )
+        return cls(points, cell_size=cell_size)
+
+    def _cell_of(self, positions: np.ndarray) -> np.ndarray:
+        return np.floor(positions / self.cell_size).astype(int)
+
+    def _as_array(self, position: Vector3D | tuple[float, float, float]) -> np.ndarray:
+        if isinstance(position, tuple):
+            return np.array(position, dtype=float)
+        return np.array((position.x, position.y, position.z), dtype=float)
+
+    def _neighbours(
+        self,
+        indexes: np.ndarray,
+        distances: np.ndarray,
+        where: Optional[Callable[[SpatialPoint], bool]],
+        limit: Optional[int] = None,
+    ) -> list[Neighbour]:
+        result = []
+        for i in indexes[np.argsort(distances[indexes], kind="stable")]:
+            point = self.points[i]
+            if where is not None and not where(point):
+                continue
+            result.append(Neighbour(point, float(distances[i])))
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    def within(
+        self,
+        position: Vector3D | tuple[float, float, float],
+        radius: float,
+        where: Optional[Callable[[SpatialPoint], bool]] = None,
+    ) -> list[Neighbour]:
+        center = self._as_array(position)
+        low = self._cell_of(center - radius)
+        high = self._cell_of(center + radius)
+        candidates = [
+            i
+            for x in range(low[0], high[0] + 1)
+            for y in range(low[1], high[1] + 1)
+            for z in range(low[2], high[2] + 1)
+            for i in self._cells.get((x, y, z), ())
+        ]
+        if not candidates:
+            return []
+        indexes = np.array(candidates)
+        distances = np.zeros(len(self.points))
+        distances[indexes] = np.linalg.norm(self.positions[indexes] - center, axis=1)
+        indexes = indexes[distances[indexes] <= radius]
+        return self._neighbours(indexes, distances, where)
+
+    def nearest(
+        self,
+        position: Vector3D | tuple[float, float, float],
+        k: int = 1,
+        where: Optional[Callable[[SpatialPoint], bool]] = None,
+    ) -> list[Neighbour]:
+        # with this few points a vectorized scan beats walking the grid rings
+        if not self.points:
+            return []
+        distances = np.linalg.norm(self.positions - self._as_array(position), axis=1)
+        return self._neighbours(np.arange(len(self.points)), distances, where, k)
@@ -0,0 +1,535 @@
+import os
+import sqlite3
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import NamedTuple
+from typing import Optional
+
+from echostats._abc import BaseTransitionConsumer
+from echostats.models import ConsumerEvent
+from echostats.models import EchoEvent
+from echostats.models import GameStatus
+from echostats.models import GameStatusChanged
+from echostats.models import GoalScored
+from echostats.models import PlayerJoined
+from echostats.models import PossessionChanged
+from echostats.models import Stats
+from echostats.models import Throw
+from echostats.models import Transition
+from echostats.streamer import FileStreamer
+from echostats.transitions import COUNTED_STATS
+
+THROW_FIELDS = tuple(Throw.__fields__.keys())
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS replays (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    replay_id INTEGER NOT NULL REFERENCES replays(id) ON DELETE CASCADE,
+    sessionid TEXT NOT NULL,
+    map_name TEXT,
+    match_type TEXT,
+    started_at TEXT NOT NULL,
+    ended_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_sessionid ON sessions(sessionid);
+CREATE INDEX IF NOT EXISTS sessions_started_at ON sessions(started_at);
+CREATE TABLE IF NOT EXISTS players (
+    userid INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_name ON players(name);
+CREATE TABLE IF NOT EXISTS stats (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    userid INTEGER NOT NULL,
+    team_name TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    datetime TEXT NOT NULL,
+    possession_time REAL NOT NULL,
+    {", ".join(f"{name} INTEGER NOT NULL" for name in COUNTED_STATS)}
+);
+CREATE INDEX IF NOT EXISTS stats_session ON stats(session_id);
+CREATE INDEX IF NOT EXISTS stats_userid ON stats(userid, datetime);
+CREATE TABLE IF NOT EXISTS goals (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    datetime TEXT NOT NULL,
+    game_clock REAL,
+    team TEXT NOT NULL,
+    goal_type TEXT NOT NULL,
+    point_amount INTEGER NOT NULL,
+    disc_speed REAL NOT NULL,
+    distance_thrown REAL NOT NULL,
+    person_scored TEXT NOT NULL,
+    assist_scored TEXT NOT NULL,
+    scorer_userid INTEGER
+);
+CREATE INDEX IF NOT EXISTS goals_session ON goals(session_id);
+CREATE INDEX IF NOT EXISTS goals_scorer ON goals(scorer_userid, datetime);
+CREATE INDEX IF NOT EXISTS goals_person ON goals(person_scored, datetime);
+CREATE INDEX IF NOT EXISTS goals_datetime ON goals(datetime);
+CREATE TABLE IF NOT EXISTS throws (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    datetime TEXT NOT NULL,
+    game_clock REAL,
+    userid INTEGER,
+    {", ".join(f"{name} REAL NOT NULL" for name in THROW_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS throws_session ON throws(session_id);
+CREATE INDEX IF NOT EXISTS throws_userid ON throws(userid, datetime);
+CREATE TABLE IF NOT EXISTS positions (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    datetime TEXT NOT NULL,
+    userid INTEGER NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    z REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS positions_session ON positions(session_id, userid, datetime);
+"""
+
+ROUND_END_STATUSES = (
+    GameStatus.ROUND_OVER,
+    GameStatus.POST_MATCH,
+    GameStatus.POST_SUDDEN_DEATH,
+)
+
+
+class SessionRecord(NamedTuple):
+    id: int
+    replay_id: int
+    sessionid: str
+    map_name: Optional[str]
+    match_type: Optional[str]
+    started_at: datetime
+    ended_at: datetime
+
+
+class GoalRecord(NamedTuple):
+    sessionid: str
+    datetime: datetime
+    game_clock: Optional[float]
+    team: str
+    goal_type: str
+    point_amount: int
+    disc_speed: float
+    distance_thrown: float
+    person_scored: str
+    assist_scored: str
+    scorer_userid: Optional[int]
+
+
+class StoreConsumer(BaseTransitionConsumer):
+    transition_types = (GameStatusChanged, GoalScored, PlayerJoined, PossessionChanged)
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        replay_id: int,
+        position_sample_every: int = 30,
+        batch_size: int = 1000,
+    ):
+        self.connection = connection
+        self.replay_id = replay_id
+        self.position_sample_every = position_sample_every
+        self.batch_size = batch_size
+        self._rows: dict[str, list[tuple]] = {}
+        self._sessions: dict[str, int] = {}
+        self._session_id: Optional[int] = None
+        self._frame_count = 0
+        self._last_event: Optional[ConsumerEvent] = None
+        self._last_throw: Optional[Throw] = None
+        # the throw already on screen when a session starts was made before it
+        self._throw_baseline_taken = False
+        self._holder_userid: Optional[int] = None
+        self._snapshot_taken = False
+
+    def get_context_managers(self) -> Iterable[AbstractContextManager]:
+        return [self._flush_on_exit()]
+
+    @contextmanager
+    def _flush_on_exit(self) -> Iterator[None]:
+        yield
+        if self._last_event is not None and not self._snapshot_taken:
+            self._snapshot_stats(self._last_event)
+        self._close_session()
+        self.flush()
+
+    def _add_row(self, table: str, row: tuple) -> None:
+        rows = self._rows.setdefault(table, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        for table, rows in self._rows.items():
+            if rows:
+                placeholders = ", ".join("?" * len(rows[0]))
+                self.connection.executemany(
+                    f"INSERT INTO {table} VALUES ({placeholders})", rows
+                )
+        self._rows = {}
+
+    def _get_session_id(self, event: ConsumerEvent) -> Optional[int]:
+        echo_event = event.echo_event
+        if echo_event.sessionid is None:
+            return None
+        sessionid = str(echo_event.sessionid)
+        dtime = event.stream_event.datetime.isoformat(sep=" ")
+        session_id = self._sessions.get(sessionid)
+        if session_id is None:
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (replay_id, sessionid, map_name, match_type, "
+                "started_at, ended_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.replay_id,
+                    sessionid,
+                    None if echo_event.map_name is None else echo_event.map_name.value,
+                    None
+                    if echo_event.match_type is None
+                    else echo_event.match_type.value,
+                    dtime,
+                    dtime,
+                ),
+            )
+            session_id = self._sessions[sessionid] = cursor.lastrowid
+        return session_id
+
+    def _close_session(self) -> None:
+        if self._session_id is not None and self._last_event is not None:
+            self.connection.execute(
+                "UPDATE sessions SET ended_at = ? WHERE id = ?",
+                (
+                    self._last_event.stream_event.datetime.isoformat(sep=" "),
+                    self._session_id,
+                ),
+            )
+
+    def _snapshot_stats(self, event: ConsumerEvent) -> None:
+        if self._session_id is None:
+            return
+        echo_event = event.echo_event
+        round_number = (echo_event.blue_round_score or 0) + (
+            echo_event.orange_round_score or 0
+        )
+        dtime = event.stream_event.datetime.isoformat(sep=" ")
+        for team in echo_event.teams:
+            for player in team.players if team.players is not None else []:
+                stats: Stats = player.stats
+                self._add_row(
+                    "stats",
+                    (
+                        self._session_id,
+                        player.userid,
+                        team.name,
+                        round_number,
+                        dtime,
+                        stats.possession_time.total_seconds(),
+                        *(getattr(stats, name) for name in COUNTED_STATS),
+                    ),
+                )
+        self._snapshot_taken = True
+
+    def _find_userid(self, echo_event: EchoEvent, name: str) -> Optional[int]:
+        for team in echo_event.teams:
+            for player in team.players if team.players is not None else []:
+                if player.name == name:
+                    return player.userid
+        return None
+
+    def consume(self, event: ConsumerEvent) -> None:
+        echo_event = event.echo_event
+        session_id = self._get_session_id(event)
+        if session_id != self._session_id:
+            if not self._snapshot_taken and self._last_event is not None:
+                self._snapshot_stats(self._last_event)
+            self._close_session()
+            self._session_id = session_id
+            self._snapshot_taken = False
+            self._last_throw = None
+            self._throw_baseline_taken = False
+
+        super().consume(event)
+
+        dtime = event.stream_event.datetime.isoformat(sep=" ")
+        clock = (
+            None
+            if echo_event.game_clock is None
+            else echo_event.game_clock.total_seconds()
+        )
+        if not self._throw_baseline_taken:
+            self._last_throw = echo_event.last_throw
+            self._throw_baseline_taken = True
+        elif (
+            session_id is not None
+            and echo_event.last_throw is not None
+            and echo_event.last_throw != self._last_throw
+        ):
+            self._add_row(
+                "throws",
+                (
+                    session_id,
+                    dtime,
+                    clock,
+                    self._holder_userid,
+                    *(getattr(echo_event.last_throw, i) for i in THROW_FIELDS),
+                ),
+            )
+            self._last_throw = echo_event.last_throw
+
+        if (
+            session_id is not None
+            and echo_event.game_status == GameStatus.PLAYING
+            and self._frame_count % self.position_sample_every == 0
+        ):
+            for team in echo_event.teams:
+                for player in team.players if team.players is not None else []:
+                    position = player.head.position
+                    self._add_row(
+                        "positions",
+                        (
+                            session_id,
+                            dtime,
+                            player.userid,
+                            position.x,
+                            position.y,
+                            position.z,
+                        ),
+                    )
+
+        self._frame_count += 1
+        self._last_event = event
+
+    def consume_transition(self, transition: Transition, event: ConsumerEvent) -> None:
+        echo_event = event.echo_event
+        dtime = transition.datetime.isoformat(sep=" ")
+        clock = (
+            None
+            if transition.game_clock is None
+            else transition.game_clock.total_seconds()
+        )
+        match transition:
+            case PlayerJoined():
+                self.connection.execute(
+                    "INSERT INTO players (userid, name, last_seen) VALUES (?, ?, ?) "
+                    "ON CONFLICT(userid) DO UPDATE SET name = excluded.name, "
+                    "last_seen = excluded.last_seen "
+                    "WHERE excluded.last_seen >= players.last_seen",
+                    (transition.userid, transition.player_name, dtime),
+                )
+            case PossessionChanged(current_player_name=str()):
+                self._holder_userid = self._find_userid(
+                    echo_event, transition.current_player_name
+                )
+            case GameStatusChanged(current=current) if current in ROUND_END_STATUSES:
+                if not self._snapshot_taken:
+                    self._snapshot_stats(event)
+            case GameStatusChanged():
+                self._snapshot_taken = False
+            case GoalScored(last_score=last_score) if self._session_id is not None:
+                self._add_row(
+                    "goals",
+                    (
+                        self._session_id,
+                        dtime,
+                        clock,
+                        last_score.team.value,
+                        last_score.goal_type.value,
+                        last_score.point_amount,
+                        last_score.disc_speed,
+                        last_score.distance_thrown,
+                        last_score.person_scored,
+                        last_score.assist_scored,
+                        self._find_userid(echo_event, last_score.person_scored),
+                    ),
+                )
+
+
+class MatchStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        # retained bytes per consumer class name, as of the last ingest
+        self.memory_usage: dict[str, int] = {}
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "MatchStore":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def is_ingested(self, path: str) -> bool:
+        stat = os.stat(path)
+        row = self.connection.execute(
+            "SELECT size, mtime FROM replays WHERE path = ?", (os.path.abspath(path),)
+        ).fetchone()
+        return row is not None and tuple(row) == (stat.st_size, stat.st_mtime)
+
+    def ingest(self, path: str, position_sample_every: int = 30) -> bool:
+        if self.is_ingested(path):
+            return False
+        abs_path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self.connection:
+            self.connection.execute("DELETE FROM replays WHERE path = ?", (abs_path,))
+            replay_id = self.connection.execute(
+                "INSERT INTO replays (path, size, mtime, ingested_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    abs_path,
+                    stat.st_size,
+                    stat.st_mtime,
+                    datetime.now().isoformat(sep=" "),
+                ),
+            ).lastrowid
+            store_consumer = StoreConsumer(
+                self.connection,
+                replay_id=replay_id,
+                position_sample_every=position_sample_every,
+            )
+            FileStreamer(path).consume([store_consumer])
+        self.memory_usage = {
+            type(store_consumer).__name__: store_consumer.memory_usage()
+        }
+        return True
+
+    def _where(self, clauses: list[tuple[str, Any]]) -> tuple[str, list[Any]]:
+        clauses = [(clause, value) for clause, value in clauses if value is not None]
+        if not clauses:
+            return "", []
+        return " WHERE " + " AND ".join(clause for clause, _ in clauses), [
+            value for _, value in clauses
+        ]
+
+    def sessions(
+        self, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> list[SessionRecord]:
+        where, params = self._where(
+            [
+                ("started_at >= ?", since and since.isoformat(sep=" ")),
+                ("started_at < ?", until and until.isoformat(sep=" ")),
+            ]
+        )
+        rows = self.connection.execute(
+            "SELECT id, replay_id, sessionid, map_name, match_type, started_at, "
+            f"ended_at FROM sessions{where} ORDER BY started_at",
+            params,
+        ).fetchall()
+        return [
+            SessionRecord(
+                id=row[0],
+                replay_id=row[1],
+                sessionid=row[2],
+                map_name=row[3],
+                match_type=row[4],
+                started_at=datetime.fromisoformat(row[5]),
+                ended_at=datetime.fromisoformat(row[6]),
+            )
+            for row in rows
+        ]
+
+    def players(self) -> dict[int, str]:
+        return dict(self.connection.execute("SELECT userid, name FROM players"))
+
+    def goals(
+        self,
+        player_name: Optional[str] = None,
+        userid: Optional[int] = None,
+        sessionid: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> list[GoalRecord]:
+        where, params = self._where(
+            [
+                ("goals.person_scored = ?", player_name),
+                ("goals.scorer_userid = ?", userid),
+                ("sessions.sessionid = ?", sessionid),
+                ("goals.datetime >= ?", since and since.isoformat(sep=" ")),
+                ("goals.datetime < ?", until and until.isoformat(sep=" ")),
+            ]
+        )
+        rows = self.connection.execute(
+            "SELECT sessions.sessionid, goals.datetime, game_clock, team, goal_type, "
+            "point_amount, disc_speed, distance_thrown, person_scored, "
+            "assist_scored, scorer_userid FROM goals "
+            f"JOIN sessions ON sessions.id = goals.session_id{where} "
+            "ORDER BY goals.datetime",
+            params,
+        ).fetchall()
+        return [
+            GoalRecord(row[0], datetime.fromisoformat(row[1]), *row[2:]) for row in rows
+        ]
+
+    def _select_dicts(self, query: str, params: list[Any]) -> list[dict[str, Any]]:
+        cursor = self.connection.execute(query, params)
+        columns = [i[0] for i in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def throws(
+        self,
+        userid: Optional[int] = None,
+        sessionid: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> list[dict[str, Any]]:
+        where, params = self._where(
+            [
+                ("throws.userid = ?", userid),
+                ("sessions.sessionid = ?", sessionid),
+                ("throws.datetime >= ?", since and since.isoformat(sep=" ")),
+                ("throws.datetime < ?", until and until.isoformat(sep=" ")),
+            ]
+        )
+        return self._select_dicts(
+            "SELECT sessions.sessionid, throws.* FROM throws "
+            f"JOIN sessions ON sessions.id = throws.session_id{where} "
+            "ORDER BY throws.datetime",
+            params,
+        )
+
+    def stats(
+        self, userid: Optional[int] = None, sessionid: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        where, params = self._where(
+            [
+                ("stats.userid = ?", userid),
+                ("sessions.sessionid = ?", sessionid),
+            ]
+        )
+        return self._select_dicts(
+            "SELECT sessions.sessionid, stats.* FROM stats "
+            f"JOIN sessions ON sessions.id = stats.session_id{where} "
+            "ORDER BY stats.datetime",
+            params,
+        )
+
+    def positions(
+        self, sessionid: str, userid: Optional[int] = None
+    ) -> list[dict[str, Any]]:
+        where, params = self._where(
+            [
+                ("sessions.sessionid = ?", sessionid),
+                ("positions.userid = ?", userid),
+            ]
+        )
+        return self._select_dicts(
+            "SELECT positions.datetime, positions.userid, x, y, z FROM positions "
+            f"JOIN sessions ON sessions.id = positions.session_id{where} "
+            "ORDER BY positions.datetime",
+            params,
+        )
@@ -1,78 +1,445 @@
+import json
+import math
+import mmap
+import os
+import struct
 import time
 import zipfile
 from abc import ABC
 from abc import abstractmethod
+from array import array
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import ExitStack
+from datetime import datetime
 from typing import Generator
+from typing import Hashable
+from typing import IO
 from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
 
 import requests
 from echostats._abc import BaseConsumer
+from echostats._abc import BaseTransitionConsumer
 from echostats._abc import ConsumerDependent
 from echostats._abc import ConsumerMapping
+from echostats.arena import FrameArena
+from echostats.consumers.recorder import CHUNKED_LAYOUT
+from echostats.consumers.recorder import decode_timings
+from echostats.consumers.recorder import TIMINGS_SUFFIX
+from echostats.identity import IdentityRegistry
 from echostats.models import ConsumerEvent
 from echostats.models import EchoEvent
+from echostats.models import GameStatus
+from echostats.models import PausedState
 from echostats.models import StreamEvent
+from echostats.transitions import TransitionDetector
+from echostats.workers import WorkerPool
+
+ZIP_LOCAL_HEADER_SIZE = 30
 
 
 class BaseStreamer(ABC):
+    # decoded frames of finished reads are kept here when the source has a key
+    arena: Optional[FrameArena] = None
+
     @abstractmethod
     def read(self) -> Generator[StreamEvent, None, None]:
         ...
 
-    def consume(self, consumers: Iterable[BaseConsumer]):
+    def arena_key(self) -> Optional[Hashable]:
+        return None
+
+    def decode(self) -> Generator[tuple[StreamEvent, EchoEvent], None, None]:
+        key = self.arena_key() if self.arena is not None else None
+        if key is None:
+            for stream_event in self.read():
+                yield stream_event, EchoEvent.parse_obj(json.loads(stream_event.data))
+            return
+        frames = self.arena.get(key)
+        if frames is not None:
+            yield from self.arena.replay(frames)
+            return
+        writer = self.arena.writer(key)
+        for stream_event in self.read():
+            echo_event = EchoEvent.parse_obj(json.loads(stream_event.data))
+            writer.add(stream_event, echo_event)
+            yield stream_event, echo_event
+        writer.commit()
+
+    def consume(self, consumers: Iterable[BaseConsumer]) -> list[BaseConsumer]:
+        consumers = list(consumers)
+        local = [i for i in consumers if not i.out_of_process]
+        remote = [i for i in consumers if i.out_of_process]
         with ExitStack() as stack:
-            for consumer in consumers:
+            for consumer in local:
                 for conti in consumer.get_context_managers():
                     stack.enter_context(conti)
-            for stream_event in self.read():
-                echo_event = EchoEvent.parse_raw(stream_event.data)
+            pool = None
+            if remote:
+                pool = WorkerPool(remote)
+                stack.callback(pool.close)
+            identities = IdentityRegistry()
+            detector = None
+            if any(isinstance(i, BaseTransitionConsumer) for i in consumers):
+                detector = TransitionDetector()
+            for stream_event, echo_event in self.decode():
+                identities.observe(echo_event)
+                transitions = (
+                    []
+                    if detector is None
+                    else detector.detect(stream_event, echo_event)
+                )
                 event = ConsumerEvent.construct(
-                    stream_event=stream_event, echo_event=echo_event
+                    stream_event=stream_event,
+                    echo_event=echo_event,
+                    transitions=transitions,
+                    identities=identities,
                 )
-                for consumer in consumers:
+                self.on_event(event)
+                if pool is not None:
+                    pool.publish(event)
+                for consumer in local:
                     consumer.consume(event)
+            if pool is None:
+                return consumers
+            # workers hand back their final state, it replaces the local copies
+            gathered = iter(pool.gather())
+            return [next(gathered) if i.out_of_process else i for i in consumers]
+
+    def on_event(self, event: ConsumerEvent) -> None:
+        ...
 
-    def resolve(self, dependents: Iterable[ConsumerDependent]) -> ConsumerMapping:
-        consumer_dict = {}
+    def resolve(
+        self,
+        dependents: Iterable[ConsumerDependent],
+        consumers: Iterable[BaseConsumer] = (),
+    ) -> ConsumerMapping:
+        # iterated twice, a generator of dependents would be spent by the first loop
+        dependents = list(dependents)
+        # pre-built consumers take the place of default-constructed ones
+        consumer_dict = {type(consumer): consumer for consumer in consumers}
         for dependent in dependents:
             for consumer_class in dependent.get_dependencies():
                 if consumer_class not in consumer_dict:
                     consumer_dict[consumer_class] = consumer_class()
 
-        self.consume(consumer_dict.values())
+        consumer_dict = {
+            type(consumer): consumer
+            for consumer in self.consume(consumer_dict.values())
+        }
         safe_consumer_dict = ConsumerMapping(consumer_dict)
         for dependent in dependents:
             dependent.init(safe_consumer_dict)
         return safe_consumer_dict
 
 
+DEFAULT_POLLING_RATES: dict[GameStatus, float] = {
+    GameStatus.PRE_MATCH: 2,
+    GameStatus.ROUND_START: 30,
+    GameStatus.PLAYING: 60,
+    GameStatus.SCORE: 10,
+    GameStatus.ROUND_OVER: 2,
+    GameStatus.POST_MATCH: 1,
+    GameStatus.PRE_SUDDEN_DEATH: 10,
+    GameStatus.SUDDEN_DEATH: 60,
+    GameStatus.POST_SUDDEN_DEATH: 1,
+}
+
+
 class OnlineStreamer(BaseStreamer):
-    def __init__(self, ip: str, rate: float = 10):
+    def __init__(
+        self,
+        ip: str,
+        rate: float = 10,
+        port: int = 6721,
+        rates: Optional[dict[GameStatus, float]] = None,
+        paused_rate: Optional[float] = None,
+        max_backoff: float = 5.0,
+        rate_window: float = 5.0,
+    ):
         self.ip = ip
+        self.port = port
         self.count = 0
         self.rate = rate
+        # per game_status rates, statuses missing from it poll at `rate`
+        self.rates = rates if rates is not None else {}
+        self.paused_rate = paused_rate
+        self.max_backoff = max_backoff
+        self.rate_window = rate_window
+        self.game_status: Optional[GameStatus] = None
+        self.paused = False
+        self.polls = 0
+        self.unavailable = 0
+        self.rate_history: list[tuple[datetime, float]] = []
+        self.effective_rate_history: list[tuple[datetime, float]] = []
+
+    @property
+    def frames_saved(self) -> int:
+        return self.count
+
+    def on_event(self, event: ConsumerEvent) -> None:
+        echo_event = event.echo_event
+        self.game_status = echo_event.game_status
+        self.paused = (
+            echo_event.pause is not None
+            and echo_event.pause.paused_state is not None
+            and echo_event.pause.paused_state != PausedState.UN_PAUSED
+        )
+
+    @property
+    def target_rate(self) -> float:
+        if self.paused and self.paused_rate is not None:
+            return self.paused_rate
+        return self.rates.get(self.game_status, self.rate)
+
+    def _get_session(self) -> Optional[requests.Response]:
+        try:
+            return requests.get(f"http://{self.ip}:{self.port}/session")
+        except requests.ConnectionError:
+            return None
 
     def read(self) -> Generator[StreamEvent, None, None]:
+        backoff: Optional[float] = None
+        next_poll = time.monotonic()
+        window_start = next_poll
+        window_frames = 0
         while True:
-            time.sleep(1 / self.rate)
-            result_request = requests.get(f"http://{self.ip}:6721/session")
-            if result_request.status_code == 404:
-                print("skipped")
+            rate = self.target_rate
+            if not self.rate_history or self.rate_history[-1][1] != rate:
+                self.rate_history.append((datetime.now(), rate))
+            interval = 1 / rate if backoff is None else backoff
+
+            next_poll += interval
+            delay = next_poll - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # running late, don't try to catch up with a burst of polls
+                next_poll = time.monotonic()
+
+            now = time.monotonic()
+            if now - window_start >= self.rate_window:
+                self.effective_rate_history.append(
+                    (datetime.now(), window_frames / (now - window_start))
+                )
+                window_start = now
+                window_frames = 0
+
+            self.polls += 1
+            sent = time.monotonic()
+            result_request = self._get_session()
+            received = time.monotonic()
+            if result_request is None or result_request.status_code == 404:
+                self.unavailable += 1
+                backoff = min(self.max_backoff, 2 * interval)
                 continue
+            backoff = None
+
+            self.count += 1
+            window_frames += 1
+            # stamped on arrival, not whenever a consumer gets to the frame
+            yield StreamEvent(
+                data=result_request.content,
+                datetime=datetime.now(),
+                sent=sent,
+                received=received,
+            )
 
-            print(f"{result_request.status_code=}")
-            yield StreamEvent(data=result_request.content)
+
+class ChunkHeader(NamedTuple):
+    info: zipfile.ZipInfo
+    frames: int
+    first: datetime
+    last: datetime
 
 
 class FileStreamer(BaseStreamer):
-    def __init__(self, path: str):
+    block_size = 1 << 20
+
+    def __init__(
+        self,
+        path: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_workers: Optional[int] = None,
+        arena: Optional[FrameArena] = None,
+    ):
         self.path = path
+        # frames outside [start, end] are skipped, whole chunks when possible
+        self.start = start
+        self.end = end
+        self.max_workers = max_workers
+        self.arena = arena
 
-    def read(self) -> Generator[StreamEvent, None, None]:
+    def arena_key(self) -> Optional[Hashable]:
+        stat = os.stat(self.path)
+        return (
+            os.path.abspath(self.path),
+            stat.st_size,
+            stat.st_mtime,
+            self.start,
+            self.end,
+        )
+
+    def _parse_lines(
+        self, buffer: bytes | mmap.mmap, start: int, end: int
+    ) -> Generator[StreamEvent, None, None]:
+        # slicing is the only copy of a line, the parser takes the bytes as they are
+        find = buffer.find
+        while start < end:
+            newline = find(b"\n", start, end)
+            if newline == -1:
+                newline = end
+            tab = find(b"\t", start, newline)
+            if tab != -1:
+                yield StreamEvent.construct(
+                    data=buffer[tab + 1 : newline],
+                    datetime=datetime.fromisoformat(buffer[start:tab].decode()),
+                )
+            start = newline + 1
+
+    def _read_mapped(self, start: int, size: int) -> Generator[StreamEvent, None, None]:
+        with open(self.path, "rb") as echo_file:
+            with mmap.mmap(echo_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from self._parse_lines(mapped, start, start + size)
+
+    def _read_blocks(self, echo_file: IO[bytes]) -> Generator[StreamEvent, None, None]:
+        rest = b""
+        while block := echo_file.read(self.block_size):
+            buffer = rest + block
+            last_newline = buffer.rfind(b"\n")
+            if last_newline == -1:
+                rest = buffer
+                continue
+            yield from self._parse_lines(buffer, 0, last_newline + 1)
+            rest = buffer[last_newline + 1 :]
+        if rest:
+            yield from self._parse_lines(rest, 0, len(rest))
+
+    def _get_stored_offset(self, info: zipfile.ZipInfo) -> int:
+        with open(self.path, "rb") as echo_file:
+            echo_file.seek(info.header_offset)
+            header = echo_file.read(ZIP_LOCAL_HEADER_SIZE)
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        return info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length
+
+    def _in_window(self, first: datetime, last: datetime) -> bool:
+        return (self.start is None or last >= self.start) and (
+            self.end is None or first <= self.end
+        )
+
+    def _get_chunk_headers(self, echo_file_zip: zipfile.ZipFile) -> list[ChunkHeader]:
+        headers = []
+        for info in echo_file_zip.infolist():
+            if info.filename.endswith(TIMINGS_SUFFIX):
+                continue
+            header = json.loads(info.comment)
+            headers.append(
+                ChunkHeader(
+                    info=info,
+                    frames=header["frames"],
+                    first=datetime.fromisoformat(header["first"]),
+                    last=datetime.fromisoformat(header["last"]),
+                )
+            )
+        return headers
+
+    def _read_timings(
+        self, echo_file_zip: zipfile.ZipFile, name: str
+    ) -> Optional[array]:
+        try:
+            return decode_timings(echo_file_zip.read(name + TIMINGS_SUFFIX))
+        except KeyError:
+            return None
+
+    def _with_timings(
+        self, stream_events: Iterable[StreamEvent], timings: Optional[array]
+    ) -> Generator[StreamEvent, None, None]:
+        if timings is None:
+            yield from stream_events
+            return
+        for i, stream_event in enumerate(stream_events):
+            if 2 * i + 1 < len(timings) and not math.isnan(timings[2 * i]):
+                stream_event.sent = timings[2 * i]
+                stream_event.received = timings[2 * i + 1]
+            yield stream_event
+
+    def _read_chunk(
+        self, echo_file_zip: zipfile.ZipFile, info: zipfile.ZipInfo
+    ) -> list[StreamEvent]:
+        # zlib releases the GIL, so chunks inflate in parallel across threads
+        data = echo_file_zip.read(info)
+        return list(
+            self._with_timings(
+                self._parse_lines(data, 0, len(data)),
+                self._read_timings(echo_file_zip, info.filename),
+            )
+        )
+
+    def _read_chunks(
+        self, echo_file_zip: zipfile.ZipFile
+    ) -> Generator[StreamEvent, None, None]:
+        infos = [
+            header.info
+            for header in self._get_chunk_headers(echo_file_zip)
+            if self._in_window(header.first, header.last)
+        ]
+        max_workers = self.max_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending: deque[Future] = deque()
+            for info in infos:
+                pending.append(executor.submit(self._read_chunk, echo_file_zip, info))
+                # a few chunks ahead keep the workers busy without buffering it all
+                if len(pending) > max_workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def _read_all(self) -> Generator[StreamEvent, None, None]:
+        if not zipfile.is_zipfile(self.path):
+            # plain uncompressed layout, mapped as a whole
+            yield from self._read_mapped(0, os.path.getsize(self.path))
+            return
         with zipfile.ZipFile(self.path) as echo_file_zip:
-            assert len(echo_file_zip.namelist()) == 1, echo_file_zip.namelist()
-            with echo_file_zip.open(echo_file_zip.namelist()[0]) as echo_file:
-                for line in echo_file:
-                    event_time, data = line.decode().split("\t")
-                    yield StreamEvent(data=data, datetime=event_time)
+            if echo_file_zip.comment == CHUNKED_LAYOUT:
+                yield from self._read_chunks(echo_file_zip)
+                return
+            infos = [
+                info
+                for info in echo_file_zip.infolist()
+                if not info.filename.endswith(TIMINGS_SUFFIX)
+            ]
+            assert len(infos) == 1, echo_file_zip.namelist()
+            info = infos[0]
+            timings = self._read_timings(echo_file_zip, info.filename)
+            if info.compress_type == zipfile.ZIP_STORED:
+                offset = self._get_stored_offset(info)
+            else:
+                with echo_file_zip.open(info) as echo_file:
+                    yield from self._with_timings(self._read_blocks(echo_file), timings)
+                return
+        yield from self._with_timings(
+            self._read_mapped(offset, info.compress_size), timings
+        )
+
+    def read(self) -> Generator[StreamEvent, None, None]:
+        if self.start is None and self.end is None:
+            yield from self._read_all()
+            return
+        for stream_event in self._read_all():
+            if self.end is not None and stream_event.datetime > self.end:
+                # recordings are chronological, nothing later can match
+                return
+            if self.start is None or stream_event.datetime >= self.start:
+                yield stream_event
+
+
+class MemoryStreamer(BaseStreamer):
+    def __init__(self, events: Iterable[StreamEvent]):
+        self.events = events
+
+    def read(self) -> Generator[StreamEvent, None, None]:
+        yield from self.events
@@ -0,0 +1,159 @@
+from typing import Optional
+
+from echostats.models import EchoEvent
+from echostats.models import GameStatusChanged
+from echostats.models import GoalScored
+from echostats.models import PauseChanged
+from echostats.models import Player
+from echostats.models import PlayerJoined
+from echostats.models import PlayerLeft
+from echostats.models import PossessionChanged
+from echostats.models import StatIncrement
+from echostats.models import Stats
+from echostats.models import StreamEvent
+from echostats.models import Transition
+
+# possession_time ticks on every frame while holding the disc, it is not an event
+COUNTED_STATS = tuple(
+    name for name in Stats.__fields__.keys() if name != "possession_time"
+)
+
+
+class TransitionDetector:
+    def __init__(self):
+        self._previous: Optional[EchoEvent] = None
+        self._players: dict[int, tuple[str, Player]] = {}
+
+    def _get_holder(self, echo_event: EchoEvent) -> tuple[Optional[str], Optional[str]]:
+        poss = echo_event.possession
+        if poss is None or poss.team is None:
+            return None, None
+        team = echo_event.teams[poss.team]
+        if poss.player is None or team.players is None:
+            return team.name, None
+        if poss.player >= len(team.players):
+            return team.name, None
+        return team.name, team.players[poss.player].name
+
+    def _get_increments(self, previous: Stats, current: Stats) -> dict[str, int]:
+        increments = {}
+        for name in COUNTED_STATS:
+            diff = getattr(current, name) - getattr(previous, name)
+            if diff != 0:
+                increments[name] = diff
+        return increments
+
+    def detect(
+        self, stream_event: StreamEvent, echo_event: EchoEvent
+    ) -> list[Transition]:
+        transitions: list[Transition] = []
+        previous = self._previous
+        common = dict(datetime=stream_event.datetime, game_clock=echo_event.game_clock)
+
+        if previous is None or previous.game_status != echo_event.game_status:
+            transitions.append(
+                GameStatusChanged.construct(
+                    previous=None if previous is None else previous.game_status,
+                    current=echo_event.game_status,
+                    **common,
+                )
+            )
+
+        previous_pause = (
+            None
+            if previous is None or previous.pause is None
+            else previous.pause.paused_state
+        )
+        current_pause = (
+            None if echo_event.pause is None else echo_event.pause.paused_state
+        )
+        if previous_pause != current_pause:
+            transitions.append(
+                PauseChanged.construct(
+                    previous=previous_pause, current=current_pause, **common
+                )
+            )
+
+        previous_holder = (
+            (None, None) if previous is None else self._get_holder(previous)
+        )
+        current_holder = self._get_holder(echo_event)
+        if previous_holder != current_holder:
+            transitions.append(
+                PossessionChanged.construct(
+                    previous_team_name=previous_holder[0],
+                    previous_player_name=previous_holder[1],
+                    current_team_name=current_holder[0],
+                    current_player_name=current_holder[1],
+                    **common,
+                )
+            )
+
+        # the first frame carries the last score from before the recording started
+        if (
+            previous is not None
+            and echo_event.last_score is not None
+            and echo_event.last_score != previous.last_score
+        ):
+            transitions.append(
+                GoalScored.construct(
+                    last_score=echo_event.last_score,
+                    disc_position=(
+                        None if echo_event.disc is None else echo_event.disc.position
+                    ),
+                    **common,
+                )
+            )
+
+        players: dict[int, tuple[str, Player]] = {}
+        for team in echo_event.teams:
+            for player in team.players if team.players is not None else []:
+                players[player.userid] = (team.name, player)
+                known = self._players.get(player.userid)
+                if known is None or known[0] != team.name:
+                    if known is not None:
+                        transitions.append(
+                            PlayerLeft.construct(
+                                team_name=known[0],
+                                player_name=known[1].name,
+                                userid=player.userid,
+                                **common,
+                            )
+                        )
+                    transitions.append(
+                        PlayerJoined.construct(
+                            team_name=team.name,
+                            player_name=player.name,
+                            userid=player.userid,
+                            stats=player.stats,
+                            **common,
+                        )
+                    )
+                    continue
+                if known[1].stats != player.stats:
+                    increments = self._get_increments(known[1].stats, player.stats)
+                    if increments:
+                        transitions.append(
+                            StatIncrement.construct(
+                                team_name=team.name,
+                                player_name=player.name,
+                                userid=player.userid,
+                                stats=player.stats,
+                                increments=increments,
+                                **common,
+                            )
+                        )
+        for userid, (team_name, player) in self._players.items():
+            if userid not in players:
+                transitions.append(
+                    PlayerLeft.construct(
+                        team_name=team_name,
+                        player_name=player.name,
+                        userid=userid,
+                        **common,
+                    )
+                )
+
+        self._players = players
+        self._previous = echo_event
+        return transitions
@@ -0,0 +1,213 @@
+import marshal
+import multiprocessing
+import pickle
+import struct
+from contextlib import ExitStack
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.synchronize import Semaphore
+from typing import Iterable
+from typing import Optional
+
+from echostats._abc import BaseConsumer
+from echostats.identity import IdentityRegistry
+from echostats.models import ConsumerEvent
+from echostats.models import StreamEvent
+from echostats.packing import pack_datetime
+from echostats.packing import pack_values
+from echostats.packing import unpack_datetime
+from echostats.packing import unpack_values
+
+SLOT_HEADER = struct.Struct("<I")
+END_OF_STREAM = 0xFFFFFFFF
+
+
+def pack_frame(event: ConsumerEvent) -> bytes:
+    # the parsed frame as plain values, workers rebuild it without validating
+    stream_event = event.stream_event
+    return marshal.dumps(
+        (
+            pack_datetime(stream_event.datetime),
+            stream_event.sent,
+            stream_event.received,
+            stream_event.data,
+            pack_values(event.echo_event),
+            # few frames have transitions, those few are pickled as they are
+            pickle.dumps(event.transitions, protocol=pickle.HIGHEST_PROTOCOL)
+            if event.transitions
+            else b"",
+        )
+    )
+
+
+def unpack_frame(payload: bytes, identities: IdentityRegistry) -> ConsumerEvent:
+    micros, sent, received, data, values, transitions = marshal.loads(payload)
+    echo_event = unpack_values(values)
+    # the same frames in the same order give the same ids as in the publisher
+    identities.observe(echo_event)
+    return ConsumerEvent.construct(
+        stream_event=StreamEvent.construct(
+            data=data, datetime=unpack_datetime(micros), sent=sent, received=received
+        ),
+        echo_event=echo_event,
+        transitions=pickle.loads(transitions) if transitions else [],
+        identities=identities,
+    )
+
+
+class FrameRing:
+    # fixed size slots, each frame is a length header followed by the packed frame
+    def __init__(self, slots: int, slot_size: int, name: Optional[str] = None) -> None:
+        self.slots = slots
+        self.slot_size = slot_size
+        self.owner = name is None
+        self.memory = SharedMemory(name=name, create=self.owner, size=slots * slot_size)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def write(self, sequence: int, payload: bytes) -> None:
+        if SLOT_HEADER.size + len(payload) > self.slot_size:
+            raise ValueError(
+                f"frame of {len(payload)} bytes does not fit a {self.slot_size} bytes slot"
+            )
+        offset = (sequence % self.slots) * self.slot_size
+        SLOT_HEADER.pack_into(self.memory.buf, offset, len(payload))
+        start = offset + SLOT_HEADER.size
+        self.memory.buf[start : start + len(payload)] = payload
+
+    def write_end(self, sequence: int) -> None:
+        offset = (sequence % self.slots) * self.slot_size
+        SLOT_HEADER.pack_into(self.memory.buf, offset, END_OF_STREAM)
+
+    def read(self, sequence: int) -> Optional[bytes]:
+        offset = (sequence % self.slots) * self.slot_size
+        (size,) = SLOT_HEADER.unpack_from(self.memory.buf, offset)
+        if size == END_OF_STREAM:
+            return None
+        start = offset + SLOT_HEADER.size
+        return bytes(self.memory.buf[start : start + size])
+
+    def close(self) -> None:
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def _run_worker(
+    ring_name: str,
+    slots: int,
+    slot_size: int,
+    ready: Semaphore,
+    free: Semaphore,
+    consumers: list[BaseConsumer],
+    results: Connection,
+) -> None:
+    ring = FrameRing(slots, slot_size, name=ring_name)
+    try:
+        with ExitStack() as stack:
+            for consumer in consumers:
+                for conti in consumer.get_context_managers():
+                    stack.enter_context(conti)
+            identities = IdentityRegistry()
+            sequence = 0
+            while True:
+                ready.acquire()
+                payload = ring.read(sequence)
+                free.release()
+                if payload is None:
+                    break
+                event = unpack_frame(payload, identities)
+                for consumer in consumers:
+                    consumer.consume(event)
+                sequence += 1
+        results.send(consumers)
+    except BaseException as e:
+        results.send(e)
+        raise
+    finally:
+        ring.close()
+        results.close()
+
+
+class WorkerPool:
+    # each worker owns a pair of semaphores, the publisher waits on the slowest one
+    def __init__(
+        self,
+        consumers: Iterable[BaseConsumer],
+        slots: int = 256,
+        slot_size: int = 1 << 18,
+    ) -> None:
+        self.consumers = list(consumers)
+        self.ring = FrameRing(slots, slot_size)
+        self.sequence = 0
+        context = multiprocessing.get_context("spawn")
+        self._workers = []
+        for consumer in self.consumers:
+            ready = context.Semaphore(0)
+            free = context.Semaphore(slots)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_run_worker,
+                args=(
+                    self.ring.name,
+                    slots,
+                    slot_size,
+                    ready,
+                    free,
+                    [consumer],
+                    sender,
+                ),
+                daemon=True,
+            )
+            process.start()
+            sender.close()
+            self._workers.append((process, ready, free, receiver))
+
+    def _wait_free(self) -> None:
+        for process, _, free, receiver in self._workers:
+            while not free.acquire(timeout=1.0):
+                if not process.is_alive():
+                    raise RuntimeError(
+                        f"consumer worker exited early: {self._receive(receiver)!r}"
+                    )
+
+    def publish(self, event: ConsumerEvent) -> None:
+        payload = pack_frame(event)
+        self._wait_free()
+        self.ring.write(self.sequence, payload)
+        self.sequence += 1
+        for _, ready, _, _ in self._workers:
+            ready.release()
+
+    def _receive(self, receiver: Connection) -> object:
+        try:
+            return receiver.recv() if receiver.poll() else None
+        except EOFError:
+            return None
+
+    def gather(self) -> list[BaseConsumer]:
+        self._wait_free()
+        self.ring.write_end(self.sequence)
+        for _, ready, _, _ in self._workers:
+            ready.release()
+        gathered = []
+        for process, _, _, receiver in self._workers:
+            try:
+                result = receiver.recv()
+            except EOFError:
+                result = None
+            process.join()
+            if not isinstance(result, list):
+                raise RuntimeError(f"consumer worker failed: {result!r}")
+            gathered.extend(result)
+        return gathered
+
+    def close(self) -> None:
+        for process, _, _, receiver in self._workers:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            receiver.close()
+        self.ring.close()